@@ -2,32 +2,22 @@ import streamlit as st
 import pandas as pd
 from py3dbp import Packer, Bin, Item
 import time
+from ingest import UPLOAD_TYPES, load_boxes, load_trucks
+from pack_cache import pack_cache, cache_key, file_digest
+from packing import build_containers, build_pbins, truck_names
+from profiler import StageProfiler
 start_time = time.time()
-uploaded_boxes_file = st.file_uploader("Choose a file for boxes data", type=['xlsx'])
-if uploaded_boxes_file is not None:
-    boxes_df = pd.read_excel(uploaded_boxes_file)
-else:
+# Opt-in timing of each stage, shown in the sidebar at the end of the run
+profiler = StageProfiler(enabled=st.sidebar.checkbox("Profile stages"))
+uploaded_boxes_file = st.file_uploader("Choose a file for boxes data", type=UPLOAD_TYPES)
+if uploaded_boxes_file is None:
     st.stop()
  
 # Upload trucks data
-uploaded_trucks_file = st.file_uploader("Choose a file for trucks data", type=['xlsx'])
-if uploaded_trucks_file is not None:
-    container_df = pd.read_excel(uploaded_trucks_file)
-else:
+uploaded_trucks_file = st.file_uploader("Choose a file for trucks data", type=UPLOAD_TYPES)
+if uploaded_trucks_file is None:
     st.stop()
 
-selected_df = boxes_df[['Box_ID', 'Box_Type', 'Box_Length', 'Box_Width', 'Box_Height', 'Box_Capcity']].copy()
-selected_df.columns = ['Item_Id', 'name', 'length', 'width', 'height', 'weight']
- 
-# Process bins
-pbins = {
-    name: {
-        'n': group['name'].count(),
-        's': [group['length'].iloc[0], group['width'].iloc[0], group['height'].iloc[0], group['weight'].iloc[0]]
-    }
-    for name, group in selected_df.groupby('name')
-}
- 
 def vertices(xmin=0, ymin=0, zmin=0, xmax=1, ymax=1, zmax=1):
     return {
         "x": [xmin, xmin, xmax, xmax, xmin, xmin, xmax, xmax],
@@ -38,26 +28,27 @@ def vertices(xmin=0, ymin=0, zmin=0, xmax=1, ymax=1, zmax=1):
         "k": [0, 7, 2, 3, 6, 7, 1, 6, 5, 5, 7, 2],
     }
  
-containers = container_df[['Truck_Length(Inch)', 'Truck_Width(Inch)', 'Truck_Height(Inch)']].values.tolist()
-available_trucks = ["Truck-" + str(i + 1) for i in range(len(containers))]
- 
-# Streamlit selection box for trucks
-selected_truck = st.selectbox('Select Truck:', available_trucks)
+pack_params = {
+    "bigger_first": True,
+    "distribute_items": True,
+    "number_of_decimals": 3,
+    "max_weight": 18000.0,
+}
 
 
 # ... (Pack items function with slight modifications)
-def pack_items(containers, pbins):
+def pack_items(containers, pbins, bigger_first=True, distribute_items=True, number_of_decimals=3, max_weight=18000.0):
     packer = Packer()
     for i, container in enumerate(containers):
         container_dims = [float(dim) for dim in container]
-        packer.add_bin(Bin("Truck-" + str(i + 1), *container_dims, 18000.0))
+        packer.add_bin(Bin("Truck-" + str(i + 1), *container_dims, max_weight))
 
     for name, cfg in pbins.items():
         for i in range(cfg["n"]):
             item_dims = [float(dim) for dim in cfg["s"]]
             packer.add_item(Item(f"{name}_{i}", *item_dims))
 
-    packer.pack(bigger_first=True, distribute_items=True, number_of_decimals=3)
+    packer.pack(bigger_first=bigger_first, distribute_items=distribute_items, number_of_decimals=number_of_decimals)
 
     # Collect packing results into a DataFrame
     packed_data = []
@@ -72,12 +63,40 @@ def pack_items(containers, pbins):
             })
     return pd.DataFrame(packed_data) 
 
+
+# Read both uploads and pack them; only runs when the file contents or parameters change
+def load_and_pack():
+    with profiler.stage("read manifests") as counts:
+        boxes_df = load_boxes(uploaded_boxes_file)
+        container_df = load_trucks(uploaded_trucks_file)
+        counts.update(boxes=len(boxes_df), trucks=len(container_df))
+
+    with profiler.stage("group pbins") as counts:
+        pbins = build_pbins(boxes_df)
+        counts["box_types"] = len(pbins)
+
+    containers = build_containers(container_df)
+    with profiler.stage("pack") as counts:
+        packed_df = pack_items(containers, pbins, **pack_params)
+        counts["packed"] = len(packed_df)
+    return containers, packed_df
+
+
 # Generate DataFrame with packing assignments
-packed_df = pack_items(containers, pbins)
+pack_key = cache_key(file_digest(uploaded_boxes_file), file_digest(uploaded_trucks_file), **pack_params)
+with profiler.stage("load and pack", cache_hit=pack_key in pack_cache):
+    containers, packed_df = pack_cache.get_or_compute(pack_key, load_and_pack)
+available_trucks = truck_names(containers)
+
+# Streamlit selection box for trucks
+selected_truck = st.selectbox('Select Truck:', available_trucks)
 end_time = time.time()
 total_runtime = end_time - start_time
 st.write(f"Total Runtime (seconds): {total_runtime:.3f}") # Display with 3 decimal places
 
 # Display the DataFrame 
-st.dataframe(packed_df)
+with profiler.stage("display dataframe", rows=len(packed_df)):
+    st.dataframe(packed_df)
+
+profiler.render(st)
 
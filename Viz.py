@@ -3,32 +3,20 @@ import pandas as pd
 from py3dbp import Packer, Bin, Item
 import time
 import matplotlib.pyplot as plt
+from floorplan import draw_floor_plan
+from ingest import UPLOAD_TYPES, load_boxes, load_trucks
+from pack_cache import pack_cache, cache_key, file_digest
+from packing import build_containers, build_pbins, truck_names
 start_time = time.time()
-uploaded_boxes_file = st.file_uploader("Choose a file for boxes data", type=['xlsx'])
-if uploaded_boxes_file is not None:
-    boxes_df = pd.read_excel(uploaded_boxes_file)
-else:
+uploaded_boxes_file = st.file_uploader("Choose a file for boxes data", type=UPLOAD_TYPES)
+if uploaded_boxes_file is None:
     st.stop()
  
 # Upload trucks data
-uploaded_trucks_file = st.file_uploader("Choose a file for trucks data", type=['xlsx'])
-if uploaded_trucks_file is not None:
-    container_df = pd.read_excel(uploaded_trucks_file)
-else:
+uploaded_trucks_file = st.file_uploader("Choose a file for trucks data", type=UPLOAD_TYPES)
+if uploaded_trucks_file is None:
     st.stop()
 
-selected_df = boxes_df[['Box_ID', 'Box_Type', 'Box_Length', 'Box_Width', 'Box_Height', 'Box_Capcity']].copy()
-selected_df.columns = ['Item_Id', 'name', 'length', 'width', 'height', 'weight']
- 
-# Process bins
-pbins = {
-    name: {
-        'n': group['name'].count(),
-        's': [group['length'].iloc[0], group['width'].iloc[0], group['height'].iloc[0], group['weight'].iloc[0]]
-    }
-    for name, group in selected_df.groupby('name')
-}
- 
 def vertices(xmin=0, ymin=0, zmin=0, xmax=1, ymax=1, zmax=1):
     return {
         "x": [xmin, xmin, xmax, xmax, xmin, xmin, xmax, xmax],
@@ -39,26 +27,27 @@ def vertices(xmin=0, ymin=0, zmin=0, xmax=1, ymax=1, zmax=1):
         "k": [0, 7, 2, 3, 6, 7, 1, 6, 5, 5, 7, 2],
     }
  
-containers = container_df[['Truck_Length(Inch)', 'Truck_Width(Inch)', 'Truck_Height(Inch)']].values.tolist()
-available_trucks = ["Truck-" + str(i + 1) for i in range(len(containers))]
- 
-# Streamlit selection box for trucks
-selected_truck = st.selectbox('Select Truck:', available_trucks)
+pack_params = {
+    "bigger_first": True,
+    "distribute_items": True,
+    "number_of_decimals": 3,
+    "max_weight": 18000.0,
+}
 
 
 # ... (Pack items function with slight modifications)
-def pack_items(containers, pbins):
+def pack_items(containers, pbins, bigger_first=True, distribute_items=True, number_of_decimals=3, max_weight=18000.0):
     packer = Packer()
     for i, container in enumerate(containers):
         container_dims = [float(dim) for dim in container]
-        packer.add_bin(Bin("Truck-" + str(i + 1), *container_dims, 18000.0))
+        packer.add_bin(Bin("Truck-" + str(i + 1), *container_dims, max_weight))
 
     for name, cfg in pbins.items():
         for i in range(cfg["n"]):
             item_dims = [float(dim) for dim in cfg["s"]]
             packer.add_item(Item(f"{name}_{i}", *item_dims))
 
-    packer.pack(bigger_first=True, distribute_items=True, number_of_decimals=3)
+    packer.pack(bigger_first=bigger_first, distribute_items=distribute_items, number_of_decimals=number_of_decimals)
 
     # Collect packing results into a DataFrame
     packed_data = []
@@ -67,50 +56,66 @@ def pack_items(containers, pbins):
             packed_data.append({
                 "Item_Id": item.name,
                 "Truck": bin.name,
-                "x": item.position[0],
-                "y": item.position[1],
-                "z": item.position[2] 
+                "x": float(item.position[0]),
+                "y": float(item.position[1]),
+                "z": float(item.position[2]),
+                # Extents along the truck's length, width and height after rotation
+                **{d: float(v) for v, d in zip(item.get_dimension(), ["length", "width", "height"])},
             })
     return pd.DataFrame(packed_data) 
 
+# Read both uploads and pack them; only runs when the file contents or parameters change, so moving
+# the zoom slider or switching the floor plan mode redraws without repacking
+def load_and_pack():
+    boxes_df = load_boxes(uploaded_boxes_file)
+    containers = build_containers(load_trucks(uploaded_trucks_file))
+    return containers, pack_items(containers, build_pbins(boxes_df), **pack_params)
+
+
 # Generate DataFrame with packing assignments
-packed_df = pack_items(containers, pbins)
+pack_key = cache_key(file_digest(uploaded_boxes_file), file_digest(uploaded_trucks_file), **pack_params)
+containers, packed_df = pack_cache.get_or_compute(pack_key, load_and_pack)
+available_trucks = truck_names(containers)
+
+# Streamlit selection box for trucks
+selected_truck = st.selectbox('Select Truck:', available_trucks)
 end_time = time.time()
 total_runtime = end_time - start_time
 st.write(f"Total Runtime (seconds): {total_runtime:.3f}") # Display with 3 decimal places
 
-def visualize_packing_2d(packed_df, truck_length, truck_width):
-    fig, ax = plt.subplots()
-
-    # Truck rectangle
-    truck_rect = plt.Rectangle((0, 0), truck_length, truck_width, color='gray', alpha=0.6)
-    ax.add_patch(truck_rect)
-
-    # Items
-    for index, row in packed_df.iterrows():
-        item_rect = plt.Rectangle(
-            (row['x'], row['y']), 
-            row['length'], row['width'], 
-            color='lightblue', alpha=0.7
-        )
-        ax.add_patch(item_rect)
-        ax.annotate(row['Item_Id'], xy=(row['x'] + 0.5, row['y'] + 0.5), ha='center', va='center')
-
-    # Labels and limits
-    ax.set_xlabel('Truck Length')
-    ax.set_ylabel('Truck Width')
-    ax.set_xlim(0, truck_length + truck_length * 0.1)  # Add a bit of margin
-    ax.set_ylim(0, truck_width + truck_width * 0.1) 
-
+def visualize_packing_2d(packed_df, truck_length, truck_width, mode="footprints", xlim=None):
+    # Size the figure to the visible stretch of floor so boxes keep their shape and labels fit as you zoom in
+    xlim = xlim or (0, truck_length * 1.05)
+    aspect = truck_width * 1.05 / (xlim[1] - xlim[0])
+    fig, ax = plt.subplots(figsize=(10, min(max(10 * aspect, 1.5), 8)))
+
+    # All boxes in one collection (or one image), coloured by how high the stack reaches
+    mappable = draw_floor_plan(
+        ax,
+        packed_df['x'], packed_df['y'], packed_df['length'], packed_df['width'],
+        packed_df['z'] + packed_df['height'],
+        truck_length, truck_width,
+        labels=packed_df['Item_Id'], mode=mode, xlim=xlim,
+    )
+    fig.colorbar(mappable, ax=ax, label='Stack height')
     return fig
 
 # Display the DataFrame 
 st.dataframe(packed_df)
 
-# ... (Your existing code to get packed_df, truck, and selected_truck_dimensions)
+# Floor plan of the selected truck
+selected_truck_dimensions = containers[available_trucks.index(selected_truck)][:2]
+truck_df = packed_df[packed_df['Truck'] == selected_truck] if len(packed_df) else packed_df
+floor_mode = st.sidebar.radio("Floor plan", ["footprints", "heightmap"])
+zoom = st.sidebar.slider("Show truck length", 0.0, float(selected_truck_dimensions[0]),
+                         (0.0, float(selected_truck_dimensions[0])))
 
 # Create and display visualization
-fig = visualize_packing_2d(packed_df.copy(), *selected_truck_dimensions)  # Copy to avoid side effects
+if len(truck_df) == 0:
+    st.write("No boxes packed in the selected truck.")
+    st.stop()
+fig = visualize_packing_2d(truck_df, *selected_truck_dimensions, mode=floor_mode,
+                           xlim=zoom if zoom[1] > zoom[0] else None)
 
 st.pyplot(fig) 
 
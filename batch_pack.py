@@ -0,0 +1,139 @@
+"""Pack a directory of depot manifests without the Streamlit apps.
+
+    python batch_pack.py manifests/ --out plans/ --engine blocks --workers 8
+
+Manifests are paired by name: ``<stem>_boxes.<ext>`` goes with
+``<stem>_trucks.<ext>``, or with a shared ``trucks.<ext>`` when the depot has
+no fleet file of its own. Each pair is packed in its own worker process; the
+packed boxes are written to ``<out>/<stem>.<format>`` and one line per
+manifest goes to ``<out>/summary.json``, with the problems ``verify_packing``
+found in the plan. ``--improve SECONDS`` spends that long per manifest on
+``improve_packing`` after the greedy pass.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from improve import improve_packing
+from ingest import CACHE_DIR, UPLOAD_TYPES
+from packing import ENGINES, build_pbins, export_records, pack_manifests, truck_names
+from verify import verify_packing, violation_counts
+
+BOXES_SUFFIX = "_boxes"
+TRUCKS_SUFFIX = "_trucks"
+
+
+def _manifests(directory, suffix):
+    found = {}
+    for entry in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(entry)
+        if ext.lower().lstrip(".") in UPLOAD_TYPES and stem.endswith(suffix):
+            found.setdefault(stem[:-len(suffix)], os.path.join(directory, entry))
+    return found
+
+
+def find_manifest_pairs(directory):
+    """[(stem, boxes path, trucks path)] for every box manifest in ``directory`` that has a fleet."""
+    boxes = _manifests(directory, BOXES_SUFFIX)
+    trucks = _manifests(directory, TRUCKS_SUFFIX)
+    shared = next((os.path.join(directory, "trucks." + ext) for ext in UPLOAD_TYPES
+                   if os.path.exists(os.path.join(directory, "trucks." + ext))), None)
+    pairs = []
+    for stem, boxes_path in boxes.items():
+        trucks_path = trucks.get(stem, shared)
+        if trucks_path is None:
+            raise FileNotFoundError(f"No {stem}{TRUCKS_SUFFIX} or shared trucks manifest for {boxes_path}")
+        pairs.append((stem, boxes_path, trucks_path))
+    return pairs
+
+
+def pack_pair(stem, boxes_path, trucks_path, out_dir, fmt="csv", cache_dir=CACHE_DIR, **pack_params):
+    """Pack one manifest pair and write its plan; returns the summary line. Runs in a worker."""
+    start = time.perf_counter()
+    improve = pack_params.pop("improve", 0)
+    boxes_df, containers, packed_data = pack_manifests(boxes_path, trucks_path, cache_dir=cache_dir, **pack_params)
+    if improve:
+        packed_data, _ = improve_packing(containers, build_pbins(boxes_df), packed_data, budget=improve,
+                                         max_weight=pack_params.get("max_weight", 18000.0))
+    out_path = os.path.join(out_dir, f"{stem}.{fmt}")
+    export_records(packed_data, out_path)
+    report = verify_packing(packed_data, containers, build_pbins(boxes_df), pack_params.get("max_weight", 18000.0))
+
+    dims = np.asarray(containers, dtype=float).reshape(-1, 3)
+    packed_volume = sum(float(r["h"]) * float(r["w"]) * float(r["l"]) for r in packed_data)
+    used = {r["bin_name"] for r in packed_data}
+    return {
+        "manifest": stem,
+        "status": "done",
+        "boxes": len(boxes_df),
+        "packed": len(packed_data),
+        "unpacked": len(boxes_df) - len(packed_data),
+        "trucks": len(containers),
+        "trucks_used": sum(name in used for name in truck_names(containers)),
+        "utilization": packed_volume / float(dims.prod(axis=1).sum()) if len(dims) else 0.0,
+        "violations": violation_counts(report),
+        "seconds": time.perf_counter() - start,
+        "output": out_path,
+    }
+
+
+def run_batch(pairs, out_dir, workers=None, fmt="csv", cache_dir=CACHE_DIR, **pack_params):
+    """Pack every pair across a process pool. A failed manifest is reported, not raised."""
+    os.makedirs(out_dir, exist_ok=True)
+    summary = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(pack_pair, stem, boxes_path, trucks_path, out_dir, fmt, cache_dir, **pack_params): stem
+            for stem, boxes_path, trucks_path in pairs
+        }
+        for future in as_completed(futures):
+            try:
+                line = future.result()
+            except Exception as exc:
+                line = {"manifest": futures[future], "status": "failed", "error": f"{type(exc).__name__}: {exc}"}
+            summary.append(line)
+            yield line
+    summary.sort(key=lambda line: line["manifest"])
+    with open(os.path.join(out_dir, "summary.json"), "w") as f:
+        json.dump({"pack_params": pack_params, "manifests": summary}, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="directory of <stem>_boxes / <stem>_trucks manifests")
+    parser.add_argument("--out", default="packing_plans", help="directory for the plans and summary.json")
+    parser.add_argument("--engine", default="blocks", choices=ENGINES)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet", "json"], help="plan file format")
+    parser.add_argument("--max-weight", type=float, default=18000.0)
+    parser.add_argument("--improve", type=float, default=0.0, metavar="SECONDS",
+                        help="time per manifest to spend improving the greedy plan (default: none)")
+    parser.add_argument("--no-cache", action="store_true", help="don't use the parsed-manifest cache")
+    args = parser.parse_args(argv)
+
+    pairs = find_manifest_pairs(args.directory)
+    if not pairs:
+        print(f"No *{BOXES_SUFFIX} manifests in {args.directory}", file=sys.stderr)
+        return 1
+
+    print(f"Packing {len(pairs)} manifests with {args.engine}", file=sys.stderr)
+    failed = 0
+    for line in run_batch(pairs, args.out, args.workers, args.format, None if args.no_cache else CACHE_DIR,
+                          engine=args.engine, max_weight=args.max_weight, improve=args.improve):
+        if line["status"] == "done":
+            print(f"  {line['manifest']:<24} packed {line['packed']:>6}/{line['boxes']:<6} "
+                  f"utilization {line['utilization']:.3f}  {line['seconds']:7.2f}s"
+                  f"  problems {sum(line['violations'].values())}", file=sys.stderr)
+        else:
+            failed += 1
+            print(f"  {line['manifest']:<24} FAILED {line['error']}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
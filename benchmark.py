@@ -0,0 +1,235 @@
+"""Reproducible benchmarks for the ingest, pack and render stages.
+
+    python benchmark.py --boxes 1000 10000 --out bench.json
+    python benchmark.py --compare baseline.json --out bench.json
+
+Each scenario is a synthetic manifest (box count x box-type count x fleet size)
+generated from a fixed seed. Stages are timed separately; peak memory comes
+from one extra run under tracemalloc so it doesn't skew the timings.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from ingest import load_boxes, load_trucks
+from lod import lod_mesh_traces
+from pack_cache import PackCache
+from packing import ENGINES, build_pbins, pack_items
+from render import box_edges, box_mesh_traces, type_colors
+from results import PackResult
+from verify import verify_packing, violation_counts
+
+# Common trailer and box-truck interiors, in inches (length, width, height)
+TRUCK_SIZES = [(636, 100, 110), (576, 100, 110), (312, 96, 96), (232, 92, 94)]
+
+
+def make_boxes(n_boxes, n_types, seed=0):
+    """Synthetic box manifest with the same columns as the real uploads."""
+    rng = np.random.default_rng(seed)
+    dims = rng.integers(8, 41, size=(n_types, 3))
+    weights = rng.integers(5, 61, size=n_types)
+    types = rng.integers(0, n_types, size=n_boxes)
+    return pd.DataFrame({
+        "Box_ID": np.arange(1, n_boxes + 1),
+        "Box_Type": np.array([f"BT{t:03d}" for t in range(n_types)])[types],
+        "Box_Length": dims[types, 0].astype(float),
+        "Box_Width": dims[types, 1].astype(float),
+        "Box_Height": dims[types, 2].astype(float),
+        "Box_Capcity": weights[types].astype(float),
+    })
+
+
+def make_trucks(n_trucks, seed=0):
+    """Synthetic fleet drawn from TRUCK_SIZES."""
+    rng = np.random.default_rng(seed + 1)
+    sizes = np.array(TRUCK_SIZES, dtype=float)[rng.integers(0, len(TRUCK_SIZES), size=n_trucks)]
+    return pd.DataFrame(sizes, columns=["Truck_Length(Inch)", "Truck_Width(Inch)", "Truck_Height(Inch)"])
+
+
+def build_figure(view, truck_dims, lod=False):
+    """The figure plot_for_truck draws for one truck."""
+    fig = go.Figure()
+    colors = type_colors(view.result.type_names)
+    if lod:
+        traces, hidden, _ = lod_mesh_traces(view, truck_dims, colors)
+        fig.add_traces(traces)
+        view = view[~hidden]
+    else:
+        fig.add_traces(box_mesh_traces(view, colors))
+    xx, yy, zz = box_edges(view["xx"], view["yy"], view["zz"], view["h"], view["w"], view["l"])
+    fig.add_trace(go.Scatter3d(x=xx, y=yy, z=zz, mode="lines", line_color="black", line_width=2, hoverinfo="skip"))
+    return fig
+
+
+def measure(fn, repeat):
+    """Best wall time over ``repeat`` runs, then peak traced allocation of one more run."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return value, {"seconds": best, "peak_bytes": peak}
+
+
+def run_scenario(n_boxes, n_types, n_trucks, engines, repeat=1, fmt="csv", seed=0, max_weight=18000.0):
+    boxes_df = make_boxes(n_boxes, n_types, seed)
+    trucks_df = make_trucks(n_trucks, seed)
+    scenario = {"boxes": n_boxes, "box_types": n_types, "trucks": n_trucks}
+    stages = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        boxes_path = os.path.join(tmp, f"boxes.{fmt}")
+        trucks_path = os.path.join(tmp, f"trucks.{fmt}")
+        for df, path in ((boxes_df, boxes_path), (trucks_df, trucks_path)):
+            if fmt == "csv":
+                df.to_csv(path, index=False)
+            elif fmt == "parquet":
+                df.to_parquet(path, index=False)
+            else:
+                df.to_excel(path, index=False)
+        # cache_dir=None times a cold parse every run
+        boxes_df, stages["ingest"] = measure(
+            lambda: (load_boxes(boxes_path, cache_dir=None), load_trucks(trucks_path, cache_dir=None))[0], repeat)
+    stages["ingest"]["rows_per_second"] = n_boxes / stages["ingest"]["seconds"]
+
+    pbins, stages["group"] = measure(lambda: build_pbins(boxes_df), repeat)
+    containers = trucks_df.values.tolist()
+    truck_names = ["Truck-" + str(i + 1) for i in range(len(containers))]
+    fleet_volume = float(np.prod(trucks_df.to_numpy(), axis=1).sum())
+
+    results = []
+    for engine in engines:
+        engine_stages = dict(stages)
+        packed_data, engine_stages["pack"] = measure(
+            # A fresh pattern library each run, so timings don't depend on what earlier runs stored on disk
+            lambda: pack_items(containers, pbins, engine=engine, max_weight=max_weight,
+                               patterns=PackCache(max_entries=4096)), repeat)
+        engine_stages["pack"]["boxes_per_second"] = n_boxes / engine_stages["pack"]["seconds"]
+
+        result, engine_stages["result"] = measure(lambda: PackResult.from_records(packed_data, truck_names), repeat)
+        report, engine_stages["verify"] = measure(
+            lambda: verify_packing(result, containers, pbins, max_weight), repeat)
+
+        # Render the fullest truck, with and without occlusion culling
+        counts = np.diff(result.offsets)
+        fullest = int(np.argmax(counts))
+        view = result.truck(truck_names[fullest])
+        truck_dims = [float(dim) for dim in containers[fullest]]
+        for stage, lod in (("render", False), ("render_lod", True)):
+            fig, engine_stages[stage] = measure(lambda: build_figure(view, truck_dims, lod), repeat)
+            payload, engine_stages[stage + "_serialize"] = measure(fig.to_json, repeat)
+            engine_stages[stage]["traces"] = len(fig.data)
+            engine_stages[stage + "_serialize"]["payload_bytes"] = len(payload)
+
+        packed_volume = float((result.rows["h"] * result.rows["w"] * result.rows["l"]).sum())
+        results.append({
+            **scenario,
+            "engine": engine,
+            "packed": len(result),
+            "unpacked": n_boxes - len(result),
+            "utilization": packed_volume / fleet_volume,
+            "trucks_used": int((counts > 0).sum()),
+            "violations": violation_counts(report),
+            "stages": engine_stages,
+        })
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Regressions of ``current`` against ``baseline``: slower stages, lower utilization and new plan problems."""
+    def key(r):
+        return r["boxes"], r["box_types"], r["trucks"], r["engine"]
+
+    previous = {key(r): r for r in baseline["results"]}
+    problems = []
+    for r in current["results"]:
+        old = previous.get(key(r))
+        if old is None:
+            continue
+        label = "{} boxes / {} types / {} trucks / {}".format(*key(r))
+        for stage, metrics in r["stages"].items():
+            before = old["stages"].get(stage, {}).get("seconds")
+            if before and metrics["seconds"] > before * (1 + tolerance):
+                problems.append(f"{label}: {stage} {before:.3f}s -> {metrics['seconds']:.3f}s")
+        if r["utilization"] < old["utilization"] - 1e-9:
+            problems.append(f"{label}: utilization {old['utilization']:.4f} -> {r['utilization']:.4f}")
+        for kind, count in r.get("violations", {}).items():
+            before = old.get("violations", {}).get(kind, 0)
+            if count > before:
+                problems.append(f"{label}: {kind} {before} -> {count}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boxes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--types", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--trucks", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--engines", nargs="+", default=["blocks", "extreme-points"], choices=ENGINES,
+                        help="py3dbp is left out by default; it takes minutes past a few thousand boxes")
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet", "xlsx"], help="manifest format to ingest")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a stage counts as a regression")
+    args = parser.parse_args(argv)
+
+    report = {"environment": environment(), "results": []}
+    for n_boxes, n_types, n_trucks in itertools.product(args.boxes, args.types, args.trucks):
+        print(f"{n_boxes} boxes, {n_types} types, {n_trucks} trucks", file=sys.stderr)
+        for r in run_scenario(n_boxes, n_types, n_trucks, args.engines, args.repeat, args.format, args.seed):
+            report["results"].append(r)
+            pack = r["stages"]["pack"]
+            print(f"  {r['engine']:<15} pack {pack['seconds']:8.3f}s  {pack['boxes_per_second']:10.0f} boxes/s  "
+                  f"utilization {r['utilization']:.3f}  unpacked {r['unpacked']}  "
+                  f"problems {sum(r['violations'].values())}", file=sys.stderr)
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for problem in problems:
+            print("REGRESSION " + problem, file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+from itertools import permutations
+
+from patterns import lookup_pattern
+
+
+def orientations(length, width, height, upright=False):
+    """Distinct axis-aligned orientations of a box as (x, y, z) extents; ``upright`` keeps height vertical."""
+    if upright:
+        return sorted({(length, width, height), (width, length, height)})
+    return sorted(set(permutations((length, width, height))))
+
+
+def best_block(space, dims, count, weight, weight_left, upright=False):
+    """Best rows x columns x layers block of one box type that fits in a free space.
+
+    Returns (placed, (nx, ny, nz), (a, b, c)) or None when nothing fits.
+    """
+    _, _, _, sl, sw, sh = space
+    if weight > 0:
+        count = min(count, int(weight_left // weight))
+    if count <= 0:
+        return None
+
+    best = None
+    for a, b, c in orientations(*dims, upright=upright):
+        nx, ny, nz = int(sl // a), int(sw // b), int(sh // c)
+        if nx == 0 or ny == 0 or nz == 0:
+            continue
+        per_slice = ny * nz
+        if count >= per_slice:
+            # Whole cross-sections, stacked along the truck length
+            block = (min(nx, count // per_slice), ny, nz)
+        elif count >= ny:
+            # Not enough for one cross-section: fewer layers
+            block = (1, ny, count // ny)
+        else:
+            block = (1, count, 1)
+        placed = block[0] * block[1] * block[2]
+        depth = block[0] * a
+        key = (placed, -depth)
+        if best is None or key > best[0]:
+            best = (key, block, (a, b, c))
+    if best is None:
+        return None
+    return best[0][0], best[1], best[2]
+
+
+def wall_block(space, pattern, count, weight, weight_left):
+    """Whole walls of a stored ``pattern`` that fit along a space; (placed, walls, pattern) or None."""
+    if not pattern:
+        return None
+    per_wall = len(pattern["boxes"])
+    if weight > 0:
+        count = min(count, int(weight_left // weight))
+    walls = min(int(space[3] // pattern["depth"]), count // per_wall)
+    if walls <= 0:
+        return None
+    return walls * per_wall, walls, pattern
+
+
+def pack_truck(truck_dims, types, remaining, max_weight, upright=False, patterns=None):
+    """Fill one truck with homogeneous blocks; returns (type_index, x, y, z, a, b, c) per box.
+
+    With a ``patterns`` library, spaces spanning the truck's whole cross-section
+    can also take walls of a stored pattern that mixes orientations
+    (see ``patterns.wall_pattern``), whichever places more boxes.
+    """
+    spaces = [(0.0, 0.0, 0.0, *truck_dims)]
+    weight_left = max_weight
+    boxes = []
+    while spaces and any(remaining):
+        # Fill from the front of the truck, floor first
+        spaces.sort(key=lambda s: (s[0], s[2], s[1]))
+        space = spaces.pop(0)
+
+        spans_truck = patterns is not None and space[4] == truck_dims[1] and space[5] == truck_dims[2]
+        choice = None
+        for t, (dims, weight) in enumerate(types):
+            if not remaining[t]:
+                continue
+            block = best_block(space, dims, remaining[t], weight, weight_left, upright)
+            if spans_truck:
+                pattern = lookup_pattern(patterns, truck_dims[1], truck_dims[2], dims, upright)
+                wall = wall_block(space, pattern, remaining[t], weight, weight_left)
+                # The stored walls win over the plain block with more boxes, or as many in less depth
+                if wall is not None and (block is None or (wall[0], -wall[1] * pattern["depth"])
+                                         > (block[0], -block[1][0] * block[2][0])):
+                    block = wall
+            if block is not None and (choice is None or block[0] > choice[1][0]):
+                choice = (t, block)
+        if choice is None:
+            continue  # nothing fits this space; it stays empty
+
+        x0, y0, z0, sl, sw, sh = space
+        if isinstance(choice[1][2], dict):
+            t, (placed, walls, pattern) = choice
+            depth = pattern["depth"]
+            for i in range(walls):
+                for y, z, b, c in pattern["boxes"]:
+                    boxes.append((t, x0 + i * depth, y0 + y, z0 + z, depth, b, c))
+            remaining[t] -= placed
+            weight_left -= placed * types[t][1]
+            # The rest of the truck behind the walls, and tunnels through the gaps the pattern leaves
+            bx = walls * depth
+            if sl - bx > 0:
+                spaces.append((x0 + bx, y0, z0, sl - bx, sw, sh))
+            spaces.extend((x0, y0 + y, z0 + z, bx, b, c) for y, z, b, c in pattern["free"])
+            continue
+
+        t, (placed, (nx, ny, nz), (a, b, c)) = choice
+        for i in range(nx):
+            for k in range(nz):
+                for j in range(ny):
+                    boxes.append((t, x0 + i * a, y0 + j * b, z0 + k * c, a, b, c))
+        remaining[t] -= placed
+        weight_left -= placed * types[t][1]
+
+        # Guillotine split of the leftover space around the block
+        bx, by, bz = nx * a, ny * b, nz * c
+        for s in (
+            (x0 + bx, y0, z0, sl - bx, sw, sh),
+            (x0, y0 + by, z0, bx, sw - by, sh),
+            (x0, y0, z0 + bz, bx, by, sh - bz),
+        ):
+            if s[3] > 0 and s[4] > 0 and s[5] > 0:
+                spaces.append(s)
+    return boxes
+
+
+def pack_blocks(containers, pbins, bigger_first=True, max_weight=18000.0, number_of_decimals=3,
+                sort_by="volume", upright=False, patterns=None, progress=None):
+    """Block-building alternative to py3dbp that packs per Box_Type rather than per box.
+
+    Box types are offered largest first by ``sort_by`` ("volume" or "footprint").
+    ``patterns`` is a library of wall patterns (``patterns.pattern_library()``)
+    looked up per truck cross-section and box size, and filled on a miss.
+
+    Returns records in the same shape as ``pack_items``: bin_name, bin_index,
+    h/w/l (x/y/z extents) and xx/yy/zz (position). ``progress(bin_name, records)``
+    is called after each truck is filled.
+    """
+    names = list(pbins)
+    types = [
+        ([float(dim) for dim in pbins[name]["s"][:3]], float(pbins[name]["s"][3]))
+        for name in names
+    ]
+    # Larger boxes first so small ones fill the gaps they leave
+    if sort_by == "footprint":
+        size = [dims[0] * dims[1] for dims, _ in types]
+    else:
+        size = [dims[0] * dims[1] * dims[2] for dims, _ in types]
+    order = sorted(range(len(names)), key=lambda t: size[t], reverse=True)
+    names = [names[t] for t in order]
+    types = [types[t] for t in order]
+    remaining = [int(pbins[name]["n"]) for name in names]
+    next_id = [0] * len(names)  # boxes are named <Box_Type>_<k> like py3dbp items
+
+    bins = sorted(
+        (("Truck-" + str(i + 1), [float(dim) for dim in container]) for i, container in enumerate(containers)),
+        key=lambda b: b[1][0] * b[1][1] * b[1][2],
+        reverse=bigger_first,
+    )
+
+    packed_data = []
+    for i, (bin_name, truck_dims) in enumerate(bins):
+        if not any(remaining):
+            break
+        start = len(packed_data)
+        for t, x, y, z, a, b, c in pack_truck(truck_dims, types, remaining, max_weight, upright, patterns):
+            packed_data.append({
+                "bin_name": bin_name,
+                "bin_index": i,
+                "name": f"{names[t]}_{next_id[t]}",
+                "h": round(a, number_of_decimals),
+                "w": round(b, number_of_decimals),
+                "l": round(c, number_of_decimals),
+                "xx": round(x, number_of_decimals),
+                "yy": round(y, number_of_decimals),
+                "zz": round(z, number_of_decimals),
+            })
+            next_id[t] += 1
+        if progress is not None:
+            progress(bin_name, packed_data[start:])
+    return packed_data
@@ -0,0 +1,203 @@
+import bisect
+from itertools import permutations
+
+from stability import TruckLoad
+
+EPS = 1e-9
+
+
+class GridIndex:
+    """Uniform grid of buckets over a truck; each placed box is listed in every cell it touches."""
+
+    def __init__(self, cell):
+        self.cell = cell
+        self.buckets = {}
+        self.boxes = []
+
+    def _cells(self, x, y, z, a, b, c):
+        cell = self.cell
+        for i in range(int(x // cell), int((x + a - EPS) // cell) + 1):
+            for j in range(int(y // cell), int((y + b - EPS) // cell) + 1):
+                for k in range(int(z // cell), int((z + c - EPS) // cell) + 1):
+                    yield i, j, k
+
+    def add(self, box):
+        idx = len(self.boxes)
+        self.boxes.append(box)
+        for key in self._cells(*box):
+            self.buckets.setdefault(key, []).append(idx)
+
+    def collides(self, x, y, z, a, b, c):
+        boxes = self.boxes
+        for key in self._cells(x, y, z, a, b, c):
+            for idx in self.buckets.get(key, ()):
+                bx, by, bz, ba, bb, bc = boxes[idx]
+                if (
+                    x < bx + ba - EPS and bx < x + a - EPS and
+                    y < by + bb - EPS and by < y + b - EPS and
+                    z < bz + bc - EPS and bz < z + c - EPS
+                ):
+                    return True
+        return False
+
+    def contains_point(self, x, y, z):
+        cell = self.cell
+        for idx in self.buckets.get((int(x // cell), int(y // cell), int(z // cell)), ()):
+            bx, by, bz, ba, bb, bc = self.boxes[idx]
+            if bx <= x < bx + ba and by <= y < by + bb and bz <= z < bz + bc:
+                return True
+        return False
+
+
+class ExtremePointBin:
+    """One truck being filled: extreme-point candidates kept sorted floor-first, back-to-front.
+
+    With a ``min_support`` share, a box above the floor is only placed where at
+    least that much of its footprint rests on box tops, as seen by a
+    ``stability.TruckLoad`` heightmap.
+    """
+
+    def __init__(self, dims, max_weight, cell, min_support=0.0):
+        self.dims = dims
+        self.weight_left = max_weight
+        self.index = GridIndex(cell)
+        self.points = [(0.0, 0.0, 0.0)]  # (z, x, y) so the sort order is floor, then length, then width
+        self.min_support = min_support
+        self.load = TruckLoad(dims) if min_support > 0 else None
+
+    @classmethod
+    def from_boxes(cls, dims, max_weight, cell, boxes, weight=0.0, extra_points=(), min_support=0.0):
+        """A bin that already holds ``boxes`` (x, y, z, a, b, c) weighing ``weight`` in total.
+
+        Candidates are the origin, the three projections of every box and
+        ``extra_points`` (e.g. corners freed by removed boxes), minus any that
+        fall inside a box. With ``min_support``, new boxes must rest on the
+        floor or on the tops of ``boxes``.
+        """
+        ep_bin = cls(dims, max_weight - weight, cell, min_support)
+        for box in boxes:
+            ep_bin.index.add(box)
+            if ep_bin.load is not None:
+                ep_bin.load.add(*box)
+        L, W, H = dims
+        candidates = {(0.0, 0.0, 0.0), *extra_points}
+        for x, y, z, a, b, c in boxes:
+            candidates.update(((x + a, y, z), (x, y + b, z), (x, y, z + c)))
+        ep_bin.points = sorted(
+            (pz, px, py) for px, py, pz in candidates
+            if px < L - EPS and py < W - EPS and pz < H - EPS and not ep_bin.index.contains_point(px, py, pz)
+        )
+        return ep_bin
+
+    def place(self, rotations, weight):
+        """Place a box at the first extreme point where any rotation fits; returns the box or None."""
+        if weight > self.weight_left:
+            return None
+        L, W, H = self.dims
+        for n, (z, x, y) in enumerate(self.points):
+            for a, b, c in rotations:
+                if x + a > L + EPS or y + b > W + EPS or z + c > H + EPS:
+                    continue
+                if self.index.collides(x, y, z, a, b, c):
+                    continue
+                if self.load is not None and self.load.support(x, y, z, a, b) < self.min_support:
+                    continue
+                box = (x, y, z, a, b, c)
+                del self.points[n]
+                self.index.add(box)
+                if self.load is not None:
+                    self.load.add(*box, weight)
+                self.weight_left -= weight
+                self._add_points(box)
+                return box
+        return None
+
+    def _add_points(self, box):
+        x, y, z, a, b, c = box
+        L, W, H = self.dims
+        for px, py, pz in ((x + a, y, z), (x, y + b, z), (x, y, z + c)):
+            if px >= L - EPS or py >= W - EPS or pz >= H - EPS:
+                continue
+            if self.index.contains_point(px, py, pz):
+                continue
+            point = (pz, px, py)
+            n = bisect.bisect_left(self.points, point)
+            if n == len(self.points) or self.points[n] != point:
+                self.points.insert(n, point)
+        # Drop candidates the new box has just covered; only points in its height band can be inside it
+        lo = bisect.bisect_left(self.points, (z,))
+        hi = bisect.bisect_left(self.points, (z + c,))
+        self.points[lo:hi] = [p for p in self.points[lo:hi] if not (x <= p[1] < x + a and y <= p[2] < y + b)]
+
+
+def rotations_for(dims, upright=False):
+    """Allowed (x, y, z) extents of a box; ``upright`` keeps its height vertical."""
+    if upright:
+        return sorted({(dims[0], dims[1], dims[2]), (dims[1], dims[0], dims[2])})
+    return sorted(set(permutations(dims)))
+
+
+def pack_extreme_points(containers, pbins, bigger_first=True, distribute_items=True, max_weight=18000.0,
+                        number_of_decimals=3, sort_by="volume", upright=False, cell=None, min_support=0.0,
+                        progress=None):
+    """Extreme-point placement with a grid spatial index, as an alternative to py3dbp.
+
+    Each candidate is only tested against boxes sharing its grid cells, instead
+    of every box in the truck. Boxes are ordered by ``sort_by`` ("volume" or
+    "footprint"). With ``min_support`` every box above the floor rests on at
+    least that share of its footprint. Returns records in the same shape as
+    ``pack_items``; ``progress(bin_name, records)`` is called after each truck
+    is filled.
+    """
+    types = []
+    for name, cfg in pbins.items():
+        dims = [float(dim) for dim in cfg["s"][:3]]
+        size = dims[0] * dims[1] if sort_by == "footprint" else dims[0] * dims[1] * dims[2]
+        types.append((rotations_for(dims, upright), float(cfg["s"][3]), size, int(cfg["n"]), name))
+    types.sort(key=lambda t: t[2], reverse=bigger_first)
+    # (type, k) per box; boxes are named <Box_Type>_<k> like py3dbp items
+    items = [(t, k) for t in range(len(types)) for k in range(types[t][3])]
+
+    if cell is None:
+        # About the size of a typical box keeps buckets short without touching many cells
+        cell = max(sum(max(t[0][0]) for t in types) / max(len(types), 1), 1.0)
+
+    bins = sorted(
+        (("Truck-" + str(i + 1), [float(dim) for dim in container]) for i, container in enumerate(containers)),
+        key=lambda b: b[1][0] * b[1][1] * b[1][2],
+        reverse=bigger_first,
+    )
+
+    packed_data = []
+    for i, (bin_name, dims) in enumerate(bins):
+        if not items:
+            break
+        ep_bin = ExtremePointBin(dims, max_weight, cell, min_support)
+        start = len(packed_data)
+        unfitted = []
+        failed = set()  # types that found no spot since the last placement
+        for t, k in items:
+            rotations, weight = types[t][0], types[t][1]
+            box = None if t in failed else ep_bin.place(rotations, weight)
+            if box is None:
+                failed.add(t)
+                unfitted.append((t, k))
+                continue
+            failed.clear()
+            x, y, z, a, b, c = box
+            packed_data.append({
+                "bin_name": bin_name,
+                "bin_index": i,
+                "name": f"{types[t][4]}_{k}",
+                "h": round(a, number_of_decimals),
+                "w": round(b, number_of_decimals),
+                "l": round(c, number_of_decimals),
+                "xx": round(x, number_of_decimals),
+                "yy": round(y, number_of_decimals),
+                "zz": round(z, number_of_decimals),
+            })
+        if progress is not None:
+            progress(bin_name, packed_data[start:])
+        if distribute_items:
+            items = unfitted
+    return packed_data
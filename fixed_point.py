@@ -0,0 +1,130 @@
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import numpy as np
+
+from compact import ROTATIONS, box_arrays
+
+PIVOT_CHUNK = 64  # candidate positions tested against the load per numpy call
+
+
+def to_fixed(value, resolution):
+    """``value`` as a whole number of 1/``resolution`` units, rounded half-even like py3dbp's quantize."""
+    return int((Decimal(float(value)) * resolution).to_integral_value(rounding=ROUND_HALF_EVEN))
+
+
+def _round_div(a, b):
+    """``a / b`` rounded half-even, exactly, on Python ints."""
+    q, r = divmod(a, b)
+    if 2 * r > b or (2 * r == b and q % 2):
+        q += 1
+    return q
+
+
+class FixedPointBin:
+    """One truck for the fixed-point engine; placed boxes are int64 rows so a candidate is tested in one call."""
+
+    def __init__(self, dims, max_weight, capacity):
+        self.dims = np.asarray(dims, dtype=np.int64)
+        self.weight_left = max_weight
+        self.count = 0
+        self.position = np.zeros((capacity, 3), dtype=np.int64)
+        self.extent = np.zeros((capacity, 3), dtype=np.int64)
+        # Candidate corners in py3dbp's order: every box's +x corner, then every +y, then every +z
+        self.pivots = np.zeros((3, capacity, 3), dtype=np.int64)
+
+    def place(self, rotations, weight):
+        """Put a box at the first candidate corner py3dbp would accept; returns its row or None.
+
+        As in py3dbp, only the first orientation that stays inside the truck is
+        tried at each corner, and the box goes to the origin of an empty truck.
+        """
+        if weight > self.weight_left:
+            return None
+        n = self.count
+        pivots = self.pivots[:, :n].reshape(-1, 3) if n else np.zeros((1, 3), dtype=np.int64)
+        inside = np.all(pivots[:, None, :] + rotations[None, :, :] <= self.dims, axis=2)
+        candidates = np.flatnonzero(inside.any(axis=1))
+        if not len(candidates):
+            return None
+        first = inside[candidates].argmax(axis=1)
+        # Overlap on every axis is |2*p1 + d1 - 2*p2 - d2| < d1 + d2, py3dbp's centre test doubled
+        centre, extent = 2 * self.position[:n] + self.extent[:n], self.extent[:n]
+        for start in range(0, len(candidates), PIVOT_CHUNK):
+            corner = pivots[candidates[start:start + PIVOT_CHUNK]]
+            size = rotations[first[start:start + PIVOT_CHUNK]]
+            if n:
+                hit = np.all(np.abs(centre[None] - (2 * corner + size)[:, None]) < extent[None] + size[:, None], axis=2)
+                free = np.flatnonzero(~hit.any(axis=1))
+            else:
+                free = [0]
+            if len(free):
+                corner, size = corner[free[0]], size[free[0]]
+                break
+        else:
+            return None
+        self.position[n], self.extent[n] = corner, size
+        for axis in range(3):
+            self.pivots[axis, n] = corner
+            self.pivots[axis, n, axis] += size[axis]
+        self.count += 1
+        self.weight_left -= weight
+        return n
+
+
+def pack_fixed_point(containers, pbins, bigger_first=True, distribute_items=True, max_weight=18000.0,
+                     resolution=1000, progress=None):
+    """py3dbp's first-fit packing on integer coordinates in units of 1/``resolution``.
+
+    Dimensions and weights are converted once per box type and truck, the
+    geometry is exact int64 arithmetic, and results are converted back to
+    floats only in the output records. With ``resolution=10**number_of_decimals``
+    the placements are the same as py3dbp's Decimal ones. Returns records in
+    the same shape as ``pack_items``; ``progress(bin_name, records)`` is called
+    after each truck is filled.
+    """
+    names = list(pbins)
+    scale = resolution * resolution
+    types = []
+    for name in names:
+        dims = [to_fixed(dim, resolution) for dim in pbins[name]["s"][:3]]
+        rotations = np.array([[dims[j] for j in rotation] for rotation in ROTATIONS], dtype=np.int64)
+        # py3dbp sorts on the volume quantized to the working precision
+        volume = _round_div(dims[0] * dims[1] * dims[2], scale)
+        types.append((rotations, to_fixed(pbins[name]["s"][3], resolution), volume))
+    # Boxes as parallel (type, k) arrays, named <Box_Type>_<k> like py3dbp items only in the output
+    items = np.stack(box_arrays([pbins[name]["n"] for name in names], [t[2] for t in types], bigger_first), axis=1)
+
+    bins = [("Truck-" + str(i + 1), [to_fixed(dim, resolution) for dim in container])
+            for i, container in enumerate(containers)]
+    bins.sort(key=lambda b: _round_div(b[1][0] * b[1][1] * b[1][2], scale), reverse=bigger_first)
+    weight_limit = to_fixed(max_weight, resolution)
+
+    packed_data = []
+    for i, (bin_name, dims) in enumerate(bins):
+        if not len(items):
+            break
+        fixed_bin = FixedPointBin(dims, weight_limit, len(items))
+        start = len(packed_data)
+        unfitted = np.zeros(len(items), dtype=bool)
+        for j, (t, k) in enumerate(items.tolist()):
+            row = fixed_bin.place(types[t][0], types[t][1])
+            if row is None:
+                unfitted[j] = True
+                continue
+            (x, y, z), (a, b, c) = fixed_bin.position[row].tolist(), fixed_bin.extent[row].tolist()
+            packed_data.append({
+                "bin_name": bin_name,
+                "bin_index": i,
+                "name": f"{names[t]}_{k}",
+                "h": a / resolution,
+                "w": b / resolution,
+                "l": c / resolution,
+                "xx": x / resolution,
+                "yy": y / resolution,
+                "zz": z / resolution,
+            })
+        if progress is not None:
+            progress(bin_name, packed_data[start:])
+        if distribute_items:
+            items = items[unfitted]
+    return packed_data
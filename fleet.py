@@ -0,0 +1,176 @@
+from itertools import permutations
+
+import numpy as np
+
+from packing import pack_items, truck_names
+
+
+def _arrays(containers, pbins):
+    trucks = np.asarray(containers, dtype=float).reshape(-1, 3)
+    names = list(pbins)
+    dims = np.array([[float(v) for v in pbins[name]["s"][:3]] for name in names]).reshape(-1, 3)
+    weights = np.array([float(pbins[name]["s"][3]) for name in names])
+    counts = np.array([int(pbins[name]["n"]) for name in names])
+    return trucks, names, dims, weights, counts
+
+
+def type_fits(containers, pbins, max_weight=18000.0, upright=False):
+    """(box types, trucks) flags for whether one box of each type fits in each empty truck."""
+    trucks, _, dims, weights, _ = _arrays(containers, pbins)
+    rotations = [(0, 1, 2), (1, 0, 2)] if upright else list(permutations(range(3)))
+    fits = np.zeros((len(dims), len(trucks)), dtype=bool)
+    for rotation in rotations:
+        fits |= np.all(dims[:, None, list(rotation)] <= trucks[None, :, :] + 1e-9, axis=2)
+    return fits & (weights <= max_weight)[:, None]
+
+
+def _trucks_for(demand, capacities):
+    """Fewest trucks whose largest ``capacities`` add up to ``demand``, per row; -1 if even all are not enough."""
+    capacities = np.atleast_2d(capacities)
+    cumulative = np.cumsum(-np.sort(-capacities, axis=1), axis=1)
+    needed = np.sum(cumulative < np.asarray(demand)[:, None] * (1 - 1e-9), axis=1) + 1
+    needed[np.asarray(demand) <= 0] = 0
+    needed[needed > capacities.shape[1]] = -1
+    return needed
+
+
+def fleet_bounds(containers, pbins, max_weight=18000.0, upright=False):
+    """Lower bounds on the number of trucks any plan needs for the boxes that can be packed at all.
+
+    - volume: the largest trucks must together hold the total box volume
+    - weight: every truck carries at most ``max_weight``
+    - fit: each box type needs enough of the trucks it fits in, counting
+      ``floor(truck volume / box volume)`` boxes per truck
+
+    Box types that fit no truck (too big in some dimension, or heavier than
+    ``max_weight``) are left out and listed under ``unfit_types``. When even
+    the whole fleet can't carry the rest, ``insufficient`` is set, the volume
+    and fit bounds it falls short on are None, ``short_types`` lists the types
+    with more boxes than all the trucks they fit in can hold, and
+    ``lower_bound`` is every truck.
+    """
+    trucks, names, dims, weights, counts = _arrays(containers, pbins)
+    fits = type_fits(containers, pbins, max_weight, upright)
+    packable = fits.any(axis=1)
+    truck_volume = trucks.prod(axis=1)
+    box_volume = dims.prod(axis=1)
+
+    volume = float((box_volume * counts)[packable].sum())
+    weight = float((weights * counts)[packable].sum())
+    volume_bound = int(_trucks_for([volume], truck_volume)[0])
+    weight_bound = int(np.ceil(weight / max_weight - 1e-9)) if weight else 0
+    # Boxes of one type per truck can't exceed its volume over the box volume, and are 0 where the type doesn't fit
+    per_truck = np.where(fits, np.floor(truck_volume[None, :] / np.maximum(box_volume, 1e-12)[:, None] + 1e-9), 0)
+    fit_needed = _trucks_for(counts[packable], per_truck[packable]) if packable.any() else np.zeros(0, dtype=int)
+    # _trucks_for gives -1 where all the trucks together are not enough
+    short_types = [name for name, n in zip([name for name, ok in zip(names, packable) if ok], fit_needed) if n < 0]
+    fit_bound = None if short_types else int(fit_needed.max(initial=0))
+    volume_bound = None if volume_bound < 0 else volume_bound
+    insufficient = volume_bound is None or fit_bound is None or weight_bound > len(trucks)
+    return {
+        "trucks": len(trucks),
+        "lower_bound": len(trucks) if insufficient else max(volume_bound, weight_bound, fit_bound),
+        "insufficient": insufficient,
+        "short_types": short_types,
+        "volume_bound": volume_bound,
+        "weight_bound": weight_bound,
+        "fit_bound": fit_bound,
+        "box_volume": volume,
+        "box_weight": weight,
+        "fleet_volume": float(truck_volume.sum()),
+        "unfit_types": [name for name, ok in zip(names, packable) if not ok],
+        "unfit_boxes": int(counts[~packable].sum()),
+    }
+
+
+def candidate_fleet(containers, pbins, max_weight=18000.0, upright=False, fill=0.85, bigger_first=True):
+    """Indices of the smallest set of trucks worth packing first, in packing order.
+
+    Trucks are taken in volume order until they reach the lower bound and
+    their volume at ``fill`` (a typical achieved utilization) holds every box.
+    Any packable box type that fits none of them brings in the largest truck
+    it does fit.
+    """
+    trucks = np.asarray(containers, dtype=float).reshape(-1, 3)
+    volume = trucks.prod(axis=1)
+    order = np.argsort(-volume if bigger_first else volume, kind="stable")
+    bounds = fleet_bounds(containers, pbins, max_weight, upright)
+    reachable = np.searchsorted(np.cumsum(volume[order]) * fill, bounds["box_volume"] * (1 - 1e-9)) + 1
+    chosen = set(order[:max(bounds["lower_bound"], min(reachable, len(order)))].tolist())
+
+    fits = type_fits(containers, pbins, max_weight, upright)
+    for row in fits:
+        if row.any() and not row[list(chosen)].any():
+            candidates = np.flatnonzero(row)
+            chosen.add(int(candidates[np.argmax(volume[candidates])]))
+    return [int(i) for i in order if i in chosen]
+
+
+def pack_presolved(containers, pbins, engine="py3dbp", max_weight=18000.0, upright=False, fill=0.85,
+                   bigger_first=True, progress=None, stop=None, **pack_params):
+    """``pack_items`` over a pre-sized subset of the fleet, escalating while boxes are left over.
+
+    Box types that fit no truck are dropped up front instead of being retried
+    in every truck. The candidate trucks from ``candidate_fleet`` are packed
+    first; leftovers then go into the next trucks in packing order, as many at
+    a time as the bounds say they need. Records keep the full fleet's truck
+    names. Returns ``(packed_data, plan)``; ``plan`` has the bounds and the
+    number of trucks tried and used.
+    """
+    bounds = fleet_bounds(containers, pbins, max_weight, upright)
+    names = truck_names(containers)
+    batch = candidate_fleet(containers, pbins, max_weight, upright, fill, bigger_first)
+    candidates = len(batch)
+    volume = np.asarray(containers, dtype=float).reshape(-1, 3).prod(axis=1)
+    order = np.argsort(-volume if bigger_first else volume, kind="stable").tolist()
+    pool = [i for i in order if i not in batch]
+    # Still unpacked <Box_Type>_<k> indices per type, keyed by the pbins type values (often ints from xlsx)
+    unpacked = {name: list(range(int(cfg["n"]))) for name, cfg in pbins.items() if name not in bounds["unfit_types"]}
+    type_of = {str(name): name for name in unpacked}
+    packed_data = []
+    tried = []
+    rounds = 0
+
+    def relabel(records, batch, slots):
+        # Each batch numbers its boxes from 0; the k-th box of a type is that type's k-th still unpacked index
+        out = []
+        for r in records:
+            box_type, _, k = r["name"].rpartition("_")
+            t = batch[int(r["bin_name"].split("-")[1]) - 1]
+            out.append({**r, "bin_name": names[t], "bin_index": t,
+                        "name": f"{box_type}_{slots[type_of[box_type]][int(k)]}"})
+        return out
+
+    while batch:
+        slots = {name: ks for name, ks in unpacked.items() if ks}
+        if not slots:
+            break
+        left = {name: {"n": len(ks), "s": pbins[name]["s"]} for name, ks in slots.items()}
+        report = None if progress is None else (
+            lambda bin_name, records, batch=batch, slots=slots:
+                progress(names[batch[int(bin_name.split("-")[1]) - 1]], relabel(records, batch, slots)))
+        records = pack_items([containers[i] for i in batch], left, engine=engine, bigger_first=bigger_first,
+                             max_weight=max_weight, upright=upright, progress=report, stop=stop, **pack_params)
+        records = relabel(records, batch, slots)
+        packed_data.extend(records)
+        placed = {(type_of[box_type], int(k)) for box_type, _, k in (r["name"].rpartition("_") for r in records)}
+        for name, ks in slots.items():
+            unpacked[name] = [k for k in ks if (name, k) not in placed]
+        tried.extend(batch)
+        rounds += 1
+
+        left = {name: {"n": len(ks), "s": pbins[name]["s"]} for name, ks in unpacked.items() if ks}
+        if not left or not pool:
+            break
+        step = fleet_bounds([containers[i] for i in pool], left, max_weight, upright)["lower_bound"]
+        batch, pool = pool[:max(step, 1)], pool[max(step, 1):]
+
+    plan = {
+        **bounds,
+        "candidates": candidates,
+        "rounds": rounds,
+        "trucks_tried": len(tried),
+        "trucks_used": len({r["bin_name"] for r in packed_data}),
+        "unpacked": sum(len(ks) for ks in unpacked.values()) + bounds["unfit_boxes"],
+    }
+    return packed_data, plan
@@ -0,0 +1,83 @@
+import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.patches import Rectangle
+
+LABEL_MIN_PIXELS = 28  # a box's footprint must be at least this wide on screen to get a label
+MAX_LABELS = 300
+
+
+def footprints(x, y, length, width):
+    """(n, 4, 2) rectangle corners for PolyCollection, built without a Python loop."""
+    x, y, length, width = (np.asarray(a, dtype=float) for a in (x, y, length, width))
+    xs = np.stack([x, x + length, x + length, x], axis=1)
+    ys = np.stack([y, y, y + width, y + width], axis=1)
+    return np.stack([xs, ys], axis=2)
+
+
+def heightmap(x, y, length, width, top, truck_length, truck_width, cell=1.0):
+    """Top of the load over the floor as a 2D array, ``cell`` units per pixel (rows are width)."""
+    nx = max(int(np.ceil(truck_length / cell)), 1)
+    ny = max(int(np.ceil(truck_width / cell)), 1)
+    grid = np.zeros((ny, nx))
+    x0 = np.clip(np.floor(np.asarray(x, dtype=float) / cell + 1e-9), 0, nx).astype(int)
+    x1 = np.clip(np.ceil((np.asarray(x, dtype=float) + length) / cell - 1e-9), 0, nx).astype(int)
+    y0 = np.clip(np.floor(np.asarray(y, dtype=float) / cell + 1e-9), 0, ny).astype(int)
+    y1 = np.clip(np.ceil((np.asarray(y, dtype=float) + width) / cell - 1e-9), 0, ny).astype(int)
+    top = np.asarray(top, dtype=float)
+    # Lowest first, so each cell ends up with the highest box over it
+    for i in np.argsort(top, kind="stable"):
+        grid[y0[i]:y1[i], x0[i]:x1[i]] = top[i]
+    return grid
+
+
+def _labelled(x, y, length, width, top, xlim, pixels_per_unit):
+    """Indices of boxes to label: on top at their centre, in view and big enough on screen."""
+    cx, cy = x + length / 2, y + width / 2
+    idx = np.flatnonzero((np.minimum(length, width) * pixels_per_unit >= LABEL_MIN_PIXELS)
+                         & (cx >= xlim[0]) & (cx <= xlim[1]))
+    if len(idx) > MAX_LABELS * 4:
+        return idx[:0]  # zoomed too far out for labels to be readable
+    covered = ((x <= cx[idx, None]) & (cx[idx, None] < x + length)
+               & (y <= cy[idx, None]) & (cy[idx, None] < y + width)
+               & (top > top[idx, None]))
+    idx = idx[~covered.any(axis=1)]
+    return idx if len(idx) <= MAX_LABELS else idx[:0]
+
+
+def draw_floor_plan(ax, x, y, length, width, top, truck_length, truck_width, labels=None, mode="footprints",
+                    xlim=None, cmap="viridis"):
+    """Top-down view of one truck, coloured by the height each box reaches.
+
+    ``mode`` is "footprints" (one PolyCollection, highest boxes drawn last) or
+    "heightmap" (a rasterized image of the load's top surface). ``labels`` are
+    drawn only on boxes big enough on screen to hold one, so they appear as
+    ``xlim`` zooms in. Returns the mappable for a colorbar.
+    """
+    x, y, length, width, top = (np.asarray(a, dtype=float) for a in (x, y, length, width, top))
+    ax.add_patch(Rectangle((0, 0), truck_length, truck_width, facecolor="lightgray", edgecolor="black"))
+    if mode == "heightmap":
+        cell = max(truck_length, truck_width) / 1000
+        grid = np.ma.masked_equal(heightmap(x, y, length, width, top, truck_length, truck_width, cell), 0)
+        mappable = ax.imshow(grid, origin="lower", extent=(0, grid.shape[1] * cell, 0, grid.shape[0] * cell),
+                             cmap=cmap, interpolation="nearest", aspect="auto")
+    else:
+        order = np.argsort(top, kind="stable")
+        mappable = PolyCollection(footprints(x, y, length, width)[order], array=top[order], cmap=cmap,
+                                  edgecolors="black", linewidths=0.2)
+        ax.add_collection(mappable)
+
+    xlim = xlim or (0, truck_length * 1.05)
+    ax.set_xlim(*xlim)
+    ax.set_ylim(0, truck_width * 1.05)
+    ax.set_aspect("equal")
+    ax.set_xlabel("Truck Length")
+    ax.set_ylabel("Truck Width")
+
+    if labels is not None and len(top):
+        ax.apply_aspect()
+        pixels_per_unit = abs(ax.transData.transform((1, 0))[0] - ax.transData.transform((0, 0))[0])
+        labels = np.asarray(labels)
+        for i in _labelled(x, y, length, width, top, xlim, pixels_per_unit):
+            ax.text(x[i] + length[i] / 2, y[i] + width[i] / 2, labels[i], ha="center", va="center",
+                    fontsize=6, clip_on=True)
+    return mappable
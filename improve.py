@@ -0,0 +1,249 @@
+import random
+import time
+
+import numpy as np
+
+from ep_packer import ExtremePointBin, rotations_for
+from packing import pack_items, truck_names
+from portfolio import score
+from verify import supported_area
+
+EPS = 1e-9
+
+
+def _type_of(name):
+    box_type, _, k = str(name).rpartition("_")
+    return box_type, int(k)
+
+
+def _floating(boxes, min_support, tol=1e-6):
+    """Number of boxes in one truck's (n, 6) array resting on less than ``min_support`` of their footprint."""
+    if not len(boxes):
+        return 0
+    x, y, z, a, b, c = boxes.T
+    supported = supported_area(np.zeros(len(boxes)), x, y, z, a, b, c, tol)
+    return int(((z > tol) & (supported < min_support * a * b - tol)).sum())
+
+
+def _with_dependents(boxes, removed, tol=1e-6):
+    """``removed`` extended to every box resting, directly or not, on a removed box."""
+    removed = removed.copy()
+    x, y, z, a, b, c = boxes.T
+    top = z + c
+    for i in np.argsort(z, kind="stable"):
+        if removed[i] or z[i] <= tol:
+            continue
+        below = (removed & (np.abs(top - z[i]) <= tol)
+                 & (np.minimum(x + a, x[i] + a[i]) - np.maximum(x, x[i]) > tol)
+                 & (np.minimum(y + b, y[i] + b[i]) - np.maximum(y, y[i]) > tol))
+        removed[i] = below.any()
+    return removed
+
+
+def improve_packing(containers, pbins, packed_data=None, budget=10.0, stop=None, max_weight=18000.0,
+                    number_of_decimals=3, upright=False, min_support=0.5, seed=0, cell=None, **pack_params):
+    """Spend up to ``budget`` seconds improving a packing by ruin and recreate; returns the best found.
+
+    Starts from ``packed_data`` (by default a ``pack_items`` run with
+    ``pack_params``). Each step clears the back of one truck, and every box
+    resting on what was cleared, then either refills it from the cleared and
+    unpacked boxes in a perturbed order with shuffled orientations, or moves
+    the cleared boxes of a lightly loaded truck into fuller ones, so trucks
+    drain until they can be left at the depot. A step is kept when it loads no
+    less volume and leaves no more boxes with under ``min_support`` of their
+    footprint supported in the trucks it touched, so the current solution is
+    always the best so far; ``improvements`` in the report counts the steps
+    that loaded more volume or emptied a truck. Stops at the
+    budget (``None`` runs until ``stop``) or as soon as the ``stop`` event is
+    set, and returns ``(packed_data, report)``; ``interrupted`` in the report
+    says whether ``stop`` ended the search.
+    """
+    start = time.monotonic()
+    deadline = None if budget is None else start + budget
+    if packed_data is None:
+        packed_data = pack_items(containers, pbins, max_weight=max_weight, number_of_decimals=number_of_decimals,
+                                 upright=upright, **pack_params)
+
+    def out_of_time():
+        return (stop is not None and stop.is_set()) or (deadline is not None and time.monotonic() >= deadline)
+
+    names = list(pbins)
+    type_index = {str(name): t for t, name in enumerate(names)}
+    dims = [[float(dim) for dim in pbins[name]["s"][:3]] for name in names]
+    weight = np.array([float(pbins[name]["s"][3]) for name in names])
+    volume = np.array([d[0] * d[1] * d[2] for d in dims])
+    rotations = [rotations_for(d, upright) for d in dims]
+    fleet = [[float(dim) for dim in container] for container in containers]
+    bin_names = truck_names(containers)
+    if cell is None:
+        cell = max(sum(max(d) for d in dims) / max(len(dims), 1), 1.0)
+
+    # The solution: per truck an (n, 6) array of x, y, z, a, b, c and the (type, k) of each box
+    truck_of = {name: i for i, name in enumerate(bin_names)}
+    bin_index = {}
+    rows = [[] for _ in fleet]
+    ids = [[] for _ in fleet]
+    for r in packed_data:
+        box_type, k = _type_of(r["name"])
+        i = truck_of[r["bin_name"]]
+        bin_index.setdefault(i, int(r["bin_index"]))
+        rows[i].append([float(r[key]) for key in ("xx", "yy", "zz", "h", "w", "l")])
+        ids[i].append((type_index[box_type], k))
+    boxes = [np.array(b, dtype=float).reshape(-1, 6) for b in rows]
+    ids = [np.array(b, dtype=np.int64).reshape(-1, 2) for b in ids]
+    # Each type's unpacked boxes are its count minus its packed ones, so names must be unique and in range
+    counts = [int(pbins[name]["n"]) for name in names]
+    packed = [(int(t), int(k)) for truck in ids for t, k in truck]
+    if len(set(packed)) != len(packed) or any(not 0 <= k < counts[t] for t, k in packed):
+        raise ValueError("packed_data must name each box once as <Box_Type>_<k> with k below the type's count")
+    packed = set(packed)
+    pool = [(t, k) for t, n in enumerate(counts) for k in range(n) if (t, k) not in packed]
+    floating = [_floating(b, min_support) for b in boxes]
+
+    def loaded(i):
+        return float(volume[ids[i][:, 0]].sum()) if len(ids[i]) else 0.0
+
+    def refill(ep_bin, queue):
+        """Place ``queue`` (type, k) boxes into ``ep_bin``; (placed boxes, placed ids, left over) or None on timeout."""
+        placed, placed_ids, left = [], [], []
+        failed = set()  # types that found no spot since the last placement
+        for t, k in queue:
+            if out_of_time():
+                return None
+            box = None if t in failed else ep_bin.place(order_rotations[t], weight[t])
+            if box is None:
+                failed.add(t)
+                left.append((t, k))
+                continue
+            failed.clear()
+            placed.append(box)
+            placed_ids.append((t, k))
+        return placed, placed_ids, left
+
+    def ruin(i, cut):
+        """Truck ``i`` with every box reaching past ``cut`` cleared, and every box resting on those.
+
+        Returns (mask of cleared boxes, an ExtremePointBin holding the rest).
+        """
+        truck, own = boxes[i], ids[i]
+        removed = _with_dependents(truck, truck[:, 0] + truck[:, 3] > cut + EPS) if len(truck) else np.zeros(0, bool)
+        kept_ids = own[~removed]
+        ep_bin = ExtremePointBin.from_boxes(fleet[i], max_weight, cell, [tuple(b) for b in truck[~removed].tolist()],
+                                            weight=float(weight[kept_ids[:, 0]].sum()),
+                                            extra_points=[tuple(b[:3]) for b in truck[removed].tolist()])
+        return removed, ep_bin
+
+    def updated(i, keep, placed, placed_ids):
+        """(boxes, ids, floating) of truck ``i`` keeping the ``keep`` mask of its boxes and adding ``placed``."""
+        new_boxes = np.concatenate([boxes[i][keep], np.array(placed, dtype=float).reshape(-1, 6)])
+        new_ids = np.concatenate([ids[i][keep], np.array(placed_ids, dtype=np.int64).reshape(-1, 2)])
+        return new_boxes, new_ids, _floating(new_boxes, min_support)
+
+    def ruin_and_recreate(i):
+        """Clear and refill part of truck ``i``; None if rejected, else whether it loaded more volume."""
+        # Clear everything behind a random cut, or the whole truck now and then
+        cut = 0.0 if rng.random() < 0.1 else rng.uniform(0.3, 0.95) * fleet[i][0]
+        removed, ep_bin = ruin(i, cut)
+        # Perturbed order: types stay together, their sizes shaken by up to 25% either way
+        noise = {t: volume[t] * rng.uniform(0.8, 1.25) for t in range(len(names))}
+        queue = sorted([tuple(b) for b in ids[i][removed].tolist()] + pool, key=lambda p: (-noise[p[0]], p[1]))
+        filled = refill(ep_bin, queue)
+        if filled is None:
+            return None
+        placed, placed_ids, left = filled
+        change = updated(i, ~removed, placed, placed_ids)
+        gain = float(volume[change[1][:, 0]].sum()) - loaded(i)
+        if gain < -EPS or change[2] > floating[i]:
+            return None
+        boxes[i], ids[i], floating[i] = change
+        pool[:] = left
+        return gain > EPS
+
+    def relocate(i):
+        """Move the back of truck ``i`` into fuller trucks, refilling it with what doesn't fit.
+
+        None if rejected (boxes left over or less support), else whether the truck was emptied.
+        """
+        removed, ep_bin = ruin(i, rng.uniform(0.0, 0.95) * fleet[i][0])
+        if not removed.any():
+            return None
+        queue = sorted(map(tuple, ids[i][removed].tolist()), key=lambda p: (-volume[p[0]], p[1]))
+        fill = {j: loaded(j) / np.prod(fleet[j]) for j in range(len(fleet)) if len(ids[j])}
+        targets = sorted((j for j in fill if fill[j] > fill[i]), key=fill.get, reverse=True)
+        changes = {}
+        for j in targets:
+            if not queue:
+                break
+            filled = refill(ruin(j, fleet[j][0])[1], queue)
+            if filled is None:
+                return None
+            placed, placed_ids, queue = filled
+            if placed:
+                changes[j] = updated(j, np.ones(len(ids[j]), bool), placed, placed_ids)
+                if changes[j][2] > floating[j]:
+                    return None
+        if len(changes) == 0:
+            return None
+        filled = refill(ep_bin, queue)
+        if filled is None or filled[2]:
+            return None
+        changes[i] = updated(i, ~removed, *filled[:2])
+        if changes[i][2] > floating[i]:
+            return None
+        for j, change in changes.items():
+            boxes[j], ids[j], floating[j] = change
+        return not len(ids[i])
+
+    rng = random.Random(seed)
+    order_rotations = list(rotations)
+    initial = score(packed_data, containers, pbins)
+    trucks_before = sum(1 for b in ids if len(b))
+    iterations = accepted = improvements = 0
+    while not out_of_time():
+        iterations += 1
+        # Orientations are tried in a shuffled order for some types
+        order_rotations = [rng.sample(r, len(r)) if rng.random() < 0.3 else r for r in rotations]
+        used = [i for i in range(len(fleet)) if len(ids[i])]
+        fill = {i: loaded(i) / np.prod(fleet[i]) for i in used}
+        if len(used) > 1 and rng.random() < 0.3:
+            # Drain one of the three emptiest trucks into the others
+            step = relocate(rng.choice(sorted(used, key=fill.get)[:3]))
+        else:
+            candidates = used + ([i for i in range(len(fleet)) if not len(ids[i])][:1] if pool else [])
+            if not candidates:
+                break
+            # Emptier trucks are picked more often; a truck nothing can be added to only costs one step
+            step = ruin_and_recreate(rng.choices(candidates, weights=[1.05 - fill.get(i, 0.0) for i in candidates])[0])
+        if step is not None:
+            accepted += 1
+            improvements += step
+
+    # Trucks keep their packing-order bin_index; ones the greedy pass left empty come after
+    for i in range(len(fleet)):
+        if len(ids[i]) and i not in bin_index:
+            bin_index[i] = max(bin_index.values(), default=-1) + 1
+    result = []
+    for i in sorted((i for i in range(len(fleet)) if len(ids[i])), key=bin_index.get):
+        for (x, y, z, a, b, c), (t, k) in zip(boxes[i].tolist(), ids[i].tolist()):
+            result.append({
+                "bin_name": bin_names[i],
+                "bin_index": bin_index[i],
+                "name": f"{names[t]}_{k}",
+                "h": round(a, number_of_decimals),
+                "w": round(b, number_of_decimals),
+                "l": round(c, number_of_decimals),
+                "xx": round(x, number_of_decimals),
+                "yy": round(y, number_of_decimals),
+                "zz": round(z, number_of_decimals),
+            })
+    report = {
+        "initial": initial,
+        "final": score(result, containers, pbins),
+        "trucks_used": (trucks_before, sum(1 for b in ids if len(b))),
+        "iterations": iterations,
+        "accepted": accepted,
+        "improvements": improvements,
+        "seconds": time.monotonic() - start,
+        "interrupted": stop is not None and stop.is_set(),
+    }
+    return result, report
@@ -0,0 +1,229 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from ep_packer import ExtremePointBin, pack_extreme_points, rotations_for
+from packing import truck_names
+from verify import supported_area
+
+GEOMETRY = ("xx", "yy", "zz", "h", "w", "l")
+
+
+def _type_of(name):
+    box_type, _, k = str(name).rpartition("_")
+    return (box_type, int(k)) if box_type and k.isdigit() else (str(name), -1)
+
+
+def _type_table(boxes_df):
+    """{Box_Type: ([length, width, height], weight)} from the first box of each type, like ``build_pbins``."""
+    first = boxes_df.drop_duplicates("Box_Type")
+    return {
+        str(r.Box_Type): ([float(r.Box_Length), float(r.Box_Width), float(r.Box_Height)], float(r.Box_Capcity))
+        for r in first.itertuples(index=False)
+    }
+
+
+def _loosened(kept, removed, min_support, tol=1e-6):
+    """Mask of ``kept`` records left resting on less than ``min_support`` of their footprint (or on nothing)
+    once ``removed`` are gone, counting only boxes whose support shrank, directly or through other such boxes."""
+    boxes = np.array([[float(r[k]) for k in GEOMETRY] for r in kept + removed]).reshape(-1, 6)
+    x, y, z, a, b, c = boxes.T
+    before = supported_area(np.zeros(len(boxes)), x, y, z, a, b, c, tol)
+    needed = np.maximum(min_support * a * b - tol, tol)
+    gone = np.arange(len(boxes)) >= len(kept)
+    while True:
+        left = ~gone
+        now = supported_area(np.zeros(left.sum()), x[left], y[left], z[left], a[left], b[left], c[left], tol)
+        loose = np.zeros(len(boxes), dtype=bool)
+        loose[left] = (z[left] > tol) & (now < before[left] - tol) & (now < needed[left])
+        if not loose.any():
+            return gone[:len(kept)]
+        gone |= loose
+
+
+def attach_box_ids(packed_data, boxes_df):
+    """Copy of ``packed_data`` with a ``box_id`` on every record.
+
+    Packers name boxes ``<Box_Type>_<k>``; the k-th box of a type is the k-th
+    row of that type in ``boxes_df``, the order ``build_pbins`` counts them in.
+    Records that already have a ``box_id`` are kept as they are.
+    """
+    ids = boxes_df.groupby("Box_Type", observed=True, sort=False)["Box_ID"].agg(list).to_dict()
+    ids = {str(box_type): [str(i) for i in values] for box_type, values in ids.items()}
+    records = []
+    for r in packed_data:
+        if "box_id" not in r:
+            box_type, k = _type_of(r["name"])
+            if not 0 <= k < len(ids.get(box_type, ())):
+                raise ValueError(f"{r['name']!r} is not one of the {len(ids.get(box_type, ()))} boxes of type "
+                                 f"{box_type!r} in the manifest")
+            r = {**r, "box_id": ids[box_type][k]}
+        records.append(r)
+    return records
+
+
+def name_by_box_id(packed_data, boxes_df):
+    """Copy of ``packed_data`` with each record named after its ``box_id``'s row in ``boxes_df``.
+
+    The inverse of ``attach_box_ids``: after a diff the surviving boxes keep
+    the names of the old manifest, and renaming them gives the
+    ``<Box_Type>_<k>`` that ``build_pbins`` counts for the new one.
+    """
+    names = {}
+    for box_type, box_ids in boxes_df.groupby("Box_Type", observed=True, sort=False)["Box_ID"]:
+        names.update((str(box_id), f"{box_type}_{k}") for k, box_id in enumerate(box_ids))
+    return [{**r, "name": names[r["box_id"]]} for r in packed_data]
+
+
+def manifest_diff(old_boxes_df, new_boxes_df):
+    """(rows of ``new_boxes_df`` with a Box_ID not in the old manifest, Box_IDs no longer present)."""
+    old_ids = old_boxes_df["Box_ID"].astype(str)
+    new_ids = new_boxes_df["Box_ID"].astype(str)
+    added = new_boxes_df[~new_ids.isin(old_ids).to_numpy()]
+    removed = old_ids[~old_ids.isin(new_ids).to_numpy()].tolist()
+    return added, removed
+
+
+def repack_incremental(containers, packed_data, boxes_df, added=None, removed=(), max_weight=18000.0,
+                       number_of_decimals=3, upright=False, cell=None, max_repack_trucks=3, min_support=0.0):
+    """Apply a manifest diff to an earlier packing instead of packing from scratch.
+
+    ``packed_data`` is the earlier result for ``boxes_df``; ``added`` holds the
+    new box rows and ``removed`` their Box_IDs. Removed boxes are taken out and
+    every other box keeps its placement. Added boxes go into the free space of
+    the existing trucks, emptiest first, at the extreme points left by the load
+    and the corners freed by removed boxes. Boxes left without enough support
+    by the removed ones are placed again the same way. Leftovers trigger a from-scratch
+    repack of one truck at a time (its own boxes plus the leftovers, up to
+    ``max_repack_trucks`` trucks), kept only if the truck still holds all of its
+    boxes. Boxes that were unpacked before are not retried. Added and repacked
+    boxes rest on at least ``min_support`` of their footprint.
+
+    Returns ``(packed_data, report)``; every record carries a ``box_id``. Names
+    still count boxes as in ``boxes_df``; ``name_by_box_id`` renames them for
+    the new manifest.
+    """
+    added = boxes_df.iloc[:0] if added is None else added
+    names = truck_names(containers)
+    dims_by_truck = {name: [float(dim) for dim in container] for name, container in zip(names, containers)}
+    types = _type_table(pd.concat([boxes_df, added], ignore_index=True))
+    if cell is None:
+        cell = max(sum(max(dims) for dims, _ in types.values()) / max(len(types), 1), 1.0)
+
+    removed = {str(box_id) for box_id in removed}
+    by_truck = defaultdict(list)
+    cleared = defaultdict(list)
+    next_k = Counter()
+    for r in attach_box_ids(packed_data, boxes_df):
+        box_type, k = _type_of(r["name"])
+        next_k[box_type] = max(next_k[box_type], k + 1)
+        (cleared if r["box_id"] in removed else by_truck)[r["bin_name"]].append(r)
+
+    taken_out = sum(len(gone) for gone in cleared.values())
+
+    # Boxes that rested on removed ones come out too, keeping their ids and names
+    pending = []
+    for name, gone in cleared.items():
+        loose = _loosened(by_truck[name], gone, min_support)
+        moved = [r for r, out in zip(by_truck[name], loose) if out]
+        pending.extend((r["box_id"], _type_of(r["name"])[0], r["name"]) for r in moved)
+        cleared[name] = gone + moved
+        by_truck[name] = [r for r, out in zip(by_truck[name], loose) if not out]
+    holes = {name: [tuple(float(r[k]) for k in GEOMETRY[:3]) for r in gone] for name, gone in cleared.items()}
+    resettled = len(pending)
+
+    # Added boxes get the next free <Box_Type>_<k> names; everything goes in biggest first
+    for r in added.itertuples(index=False):
+        box_type = str(r.Box_Type)
+        pending.append((str(r.Box_ID), box_type, f"{box_type}_{next_k[box_type]}"))
+        next_k[box_type] += 1
+    pending.sort(key=lambda p: -types[p[1]][0][0] * types[p[1]][0][1] * types[p[1]][0][2])
+
+    def used_volume(name):
+        return sum(float(r["h"]) * float(r["w"]) * float(r["l"]) for r in by_truck[name])
+
+    free = {name: dims[0] * dims[1] * dims[2] - used_volume(name) for name, dims in dims_by_truck.items()}
+    order = sorted(names, key=lambda name: -free[name])
+
+    def record(name, box_id, item_name, box):
+        x, y, z, a, b, c = box
+        return {
+            "bin_name": name,
+            "bin_index": names.index(name),
+            "name": item_name,
+            "box_id": box_id,
+            "h": round(a, number_of_decimals),
+            "w": round(b, number_of_decimals),
+            "l": round(c, number_of_decimals),
+            "xx": round(x, number_of_decimals),
+            "yy": round(y, number_of_decimals),
+            "zz": round(z, number_of_decimals),
+        }
+
+    # Fill free space around the fixed load; trucks are only loaded into an index once touched
+    ep_bins = {}
+    touched = set()
+    placed_in_free_space = 0
+    leftovers = []
+    for box_id, box_type, item_name in pending:
+        dims, weight = types[box_type]
+        rotations = rotations_for(dims, upright)
+        for name in order:
+            if name not in ep_bins:
+                current = by_truck[name]
+                ep_bins[name] = ExtremePointBin.from_boxes(
+                    dims_by_truck[name], max_weight, cell,
+                    [tuple(float(r[k]) for k in GEOMETRY) for r in current],
+                    weight=sum(types[_type_of(r["name"])[0]][1] for r in current),
+                    extra_points=holes.get(name, ()),
+                    min_support=min_support,
+                )
+            box = ep_bins[name].place(rotations, weight)
+            if box is not None:
+                by_truck[name].append(record(name, box_id, item_name, box))
+                touched.add(name)
+                placed_in_free_space += 1
+                break
+        else:
+            leftovers.append((box_id, box_type, item_name))
+
+    # Repack whole trucks, emptiest first, when the free space was too fragmented
+    repacked = []
+    for name in order[:max_repack_trucks]:
+        if not leftovers:
+            break
+        own = [(r["box_id"], _type_of(r["name"])[0], r["name"]) for r in by_truck[name]]
+        queue = defaultdict(list)
+        for box in own + leftovers:
+            queue[box[1]].append(box)
+        pbins = {box_type: {"n": len(queue[box_type]), "s": types[box_type][0] + [types[box_type][1]]}
+                 for box_type in queue}
+        trial = pack_extreme_points([dims_by_truck[name]], pbins, max_weight=max_weight,
+                                    number_of_decimals=number_of_decimals, upright=upright, cell=cell,
+                                    min_support=min_support)
+        placed = Counter(_type_of(r["name"])[0] for r in trial)
+        if any(placed[box_type] < n for box_type, n in Counter(box[1] for box in own).items()):
+            continue
+        # Boxes of one type are interchangeable: the truck's own boxes take the first slots
+        new_records = []
+        for r in trial:
+            box_id, box_type, item_name = queue[_type_of(r["name"])[0]].pop(0)
+            new_records.append({**r, "bin_name": name, "bin_index": names.index(name),
+                                "name": item_name, "box_id": box_id})
+        by_truck[name] = new_records
+        placed_ids = {r["box_id"] for r in new_records}
+        leftovers = [box for box in leftovers if box[0] not in placed_ids]
+        repacked.append(name)
+        touched.add(name)
+
+    report = {
+        "removed": taken_out,
+        "added": len(added),
+        "resettled": resettled,
+        "placed_in_free_space": placed_in_free_space,
+        "repacked_trucks": repacked,
+        "touched_trucks": sorted(touched | set(holes), key=names.index),
+        "unpacked": [box[0] for box in leftovers],
+    }
+    return [r for name in names for r in by_truck[name]], report
@@ -0,0 +1,131 @@
+import hashlib
+import io
+import os
+import tempfile
+
+import pandas as pd
+
+from pack_cache import CACHE_ROOT, private_dir
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Only the columns the apps use, with explicit dtypes. Box types repeat thousands
+# of times so they are categorical; dimensions and weights stay float64 so the
+# packing geometry and truck weights are the same as when read straight from Excel.
+BOX_COLUMNS = {
+    "Box_ID": "string",
+    "Box_Type": "category",
+    "Box_Length": "float64",
+    "Box_Width": "float64",
+    "Box_Height": "float64",
+    "Box_Capcity": "float64",
+}
+TRUCK_COLUMNS = {
+    "Truck_Length(Inch)": "float64",
+    "Truck_Width(Inch)": "float64",
+    "Truck_Height(Inch)": "float64",
+}
+UPLOAD_TYPES = ["xlsx", "csv", "parquet"]
+
+CACHE_DIR = os.environ.get("PACKING_INGEST_CACHE", os.path.join(CACHE_ROOT, "ingest"))
+CACHE_VERSION = "3"  # bump when the column lists or dtypes change
+
+
+def _read_bytes(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    source.seek(0)
+    return source.read()
+
+
+def _file_format(source):
+    name = os.fspath(source) if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+    ext = os.path.splitext(name)[1].lower().lstrip(".")
+    if ext in ("xlsx", "xls", "xlsm"):
+        return "xlsx"
+    if ext in ("csv", "parquet"):
+        return ext
+    if ext == "pq":
+        return "parquet"
+    raise ValueError(f"Unsupported manifest format {ext!r}; expected one of {UPLOAD_TYPES}")
+
+
+def parse_manifest(data, fmt, columns):
+    """The ``columns`` of a manifest held in ``data`` bytes of format ``fmt`` (one of UPLOAD_TYPES)."""
+    if fmt not in UPLOAD_TYPES:
+        raise ValueError(f"Unsupported manifest format {fmt!r}; expected one of {UPLOAD_TYPES}")
+    usecols = list(columns)
+    if fmt == "csv":
+        df = pd.read_csv(io.BytesIO(data), usecols=usecols, dtype=columns,
+                         engine="pyarrow" if HAS_PYARROW else "c")
+    elif fmt == "parquet":
+        df = pd.read_parquet(io.BytesIO(data), columns=usecols)
+    else:
+        # openpyxl still walks the sheet, but skipping unused columns avoids converting them
+        df = pd.read_excel(io.BytesIO(data), usecols=usecols)
+    return df[usecols].astype(columns)
+
+
+def _cache_path(digest, cache_dir):
+    # csv without pyarrow: floats round-trip exactly and dtypes are restored on read, with no pickle to trust
+    ext = "parquet" if HAS_PYARROW else "csv"
+    return os.path.join(cache_dir, f"{digest}.{ext}")
+
+
+def read_manifest(source, columns, cache_dir=CACHE_DIR):
+    """Read the needed ``columns`` from an xlsx/csv/parquet manifest, with an on-disk parse cache.
+
+    ``source`` is a path or a file-like upload with a ``name``. Parsed frames are
+    stored by content hash, so re-uploading the same file skips parsing entirely.
+    A ``cache_dir`` that another user owns or can write to is not used.
+    """
+    data = _read_bytes(source)
+    fmt = _file_format(source)
+    h = hashlib.sha256(data)
+    h.update(f"|{CACHE_VERSION}|{fmt}|{sorted(columns.items())}".encode())
+    path = None
+    if cache_dir:
+        try:
+            path = _cache_path(h.hexdigest(), private_dir(cache_dir))
+        except OSError:
+            pass  # parse without the cache
+
+    if path and os.path.exists(path):
+        try:
+            df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path, dtype=columns)
+            return df.astype(columns)
+        except Exception:
+            pass  # unreadable cache entry; parse again and overwrite it
+
+    df = parse_manifest(data, fmt, columns)
+    if path:
+        # Write then rename so concurrent sessions never read a half-written file
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            if path.endswith(".parquet"):
+                df.to_parquet(tmp, index=False)
+            else:
+                df.to_csv(tmp, index=False)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return df
+
+
+def load_boxes(source, cache_dir=CACHE_DIR):
+    """Box manifest with only the Box_* columns the packer needs."""
+    return read_manifest(source, BOX_COLUMNS, cache_dir)
+
+
+def load_trucks(source, cache_dir=CACHE_DIR):
+    """Truck manifest with only the Truck_*(Inch) dimension columns."""
+    return read_manifest(source, TRUCK_COLUMNS, cache_dir)
@@ -0,0 +1,184 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from pack_cache import result_cache
+from packing import PackingCancelled
+from profiler import StageProfiler
+
+
+class PackingStopped(Exception):
+    """Raised by a job's ``pack`` that was stopped partway but still has a usable plan, carried as ``value``."""
+
+    def __init__(self, value):
+        super().__init__("stopped early")
+        self.value = value
+
+
+class PackJob:
+    """One packing run in a worker thread, with progress the page can poll.
+
+    ``pack(progress, stop, profile)`` does the work and passes the first two on
+    to ``pack_items``, which reports each finished truck to ``progress`` and
+    gives up once the ``stop`` event is set by ``cancel``. Stages timed with
+    ``profile`` (wall and CPU time, no allocations, as tracemalloc is shared
+    with the page's thread) can be merged into the page's profiler afterwards.
+    A ``pack`` that raises ``PackingStopped`` (the improvement search keeps its
+    best plan so far) ends "stopped": its plan becomes the job's result but,
+    being cut short, is not cached as the result for its key. A job cancelled
+    any other way ends "cancelled" without a result, even if ``pack`` returned.
+    """
+
+    def __init__(self, key, pack, total_trucks, total_boxes):
+        self.key = key
+        self.pack = pack
+        self.total_trucks = total_trucks
+        self.total_boxes = total_boxes
+        self.trucks_done = 0
+        self.boxes_placed = 0
+        self.status = "queued"
+        self.error = None
+        self.seconds = None
+        self.future = None
+        self.profile = StageProfiler(enabled=True, trace_memory=False)
+        self._finished_trucks = []
+        self._records = []
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def _progress(self, bin_name, records):
+        with self._lock:
+            self._finished_trucks.append(bin_name)
+            self._records.extend(records)
+            self.trucks_done += 1
+            self.boxes_placed += len(records)
+
+    def run(self):
+        if self._cancelled.is_set():
+            self.status = "cancelled"
+            return None
+        self.status = "running"
+        start = time.perf_counter()
+        try:
+            value = self.pack(self._progress, self._cancelled, self.profile)
+        except PackingCancelled:
+            self.status = "cancelled"
+            return None
+        except PackingStopped as stopped:
+            self.status = "stopped"
+            return stopped.value
+        except Exception as exc:
+            self.status = "failed"
+            self.error = exc
+            raise
+        finally:
+            self.seconds = time.perf_counter() - start
+        if self._cancelled.is_set():
+            self.status = "cancelled"
+            return None
+        self.status = "done"
+        return value
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None and self.future.cancel():
+            self.status = "cancelled"
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def wait(self, timeout=None):
+        """Block up to ``timeout`` seconds; True once the job has stopped."""
+        try:
+            self.future.exception(timeout=timeout)
+        except FutureTimeout:
+            return False
+        except Exception:
+            pass  # cancelled before it started
+        return True
+
+    def result(self):
+        return self.future.result()
+
+    def snapshot(self):
+        """(names of trucks finished so far, their records)."""
+        with self._lock:
+            return list(self._finished_trucks), list(self._records)
+
+    def fraction(self):
+        if self.status in ("done", "stopped"):
+            return 1.0
+        return min(self.boxes_placed / self.total_boxes, 1.0) if self.total_boxes else 0.0
+
+
+class JobManager:
+    """Background packing jobs shared by every session, at most one per cache key.
+
+    A session ``watch``es the job for its current inputs. When the last session
+    watching a job moves on to other inputs, the job is cancelled so the
+    superseded run stops using CPU. Results of jobs that ran to completion go
+    into ``cache``.
+    """
+
+    def __init__(self, cache, max_workers=2):
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="packing")
+        self._jobs = {}
+        self._watchers = {}
+        # Reentrant: a future that is already done runs its callback in the thread adding it
+        self._lock = threading.RLock()
+
+    def watch(self, session, key, pack, total_trucks, total_boxes):
+        """The job for ``key``, submitted if needed, or None if its result is already cached."""
+        with self._lock:
+            self._unwatch(session, keep=key)
+            job = self._jobs.get(key)
+            if job is None:
+                if key in self.cache:
+                    return None
+                job = PackJob(key, pack, total_trucks, total_boxes)
+                self._jobs[key] = job
+                job.future = self._executor.submit(job.run)
+                job.future.add_done_callback(lambda _, job=job: self._finished(job))
+            self._watchers.setdefault(key, set()).add(session)
+            return job
+
+    def release(self, session):
+        """``session`` needs no job any more, e.g. because its result came from the cache."""
+        with self._lock:
+            self._unwatch(session)
+
+    def cancel(self, key):
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is not None:
+            job.cancel()
+
+    def _unwatch(self, session, keep=None):
+        for key, sessions in list(self._watchers.items()):
+            if key == keep or session not in sessions:
+                continue
+            sessions.discard(session)
+            if not sessions:
+                del self._watchers[key]
+                if key in self._jobs:
+                    self._jobs[key].cancel()
+
+    def _finished(self, job):
+        # The cache put and the removal happen under one lock, so ``watch`` sees either the job or the result.
+        # A "stopped" job's result was cut short, so it is not stored under a key that promises the full run
+        with self._lock:
+            if job.status == "done":
+                self.cache.put(job.key, job.future.result())
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+            self._watchers.pop(job.key, None)
+
+    def __len__(self):
+        return len(self._jobs)
+
+
+# Module-level like pack_cache so running jobs survive Streamlit reruns
+job_manager = JobManager(result_cache)
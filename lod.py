@@ -0,0 +1,165 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from render import box_type, type_colors
+
+# Truck sides that count as opaque walls, so faces flush against them are hidden.
+# The apps draw the truck body fully transparent and only the floor blocks the
+# view, so by default only faces resting on it are culled; pass more sides for
+# a viewer that draws them opaque.
+DEFAULT_WALLS = ("z-",)
+
+# Face columns: axis, side (0 = low, 1 = high), plane, type code, u0, u1, v0, v1
+AXIS, SIDE, PLANE, TYPE, U0, U1, V0, V1 = range(8)
+MAX_PAIRS = 1 << 22  # rectangle pairs tested at once per plane
+
+
+def _groups(keys):
+    """Indices of equal keys, as {key: index array}."""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+    starts = np.r_[0, bounds]
+    return dict(zip(sorted_keys[starts].tolist(), np.split(order, bounds)))
+
+
+def _overlap_area(lo_u, hi_u, lo_v, hi_v, I, J):
+    """Covered area of every face in I by faces in J and vice versa (faces lie in one plane)."""
+    area_i = np.zeros(len(I))
+    area_j = np.zeros(len(J))
+    step = max(1, MAX_PAIRS // max(len(J), 1))
+    for s in range(0, len(I), step):
+        i = I[s:s + step, None]
+        du = np.minimum(hi_u[i], hi_u[J]) - np.maximum(lo_u[i], lo_u[J])
+        dv = np.minimum(hi_v[i], hi_v[J]) - np.maximum(lo_v[i], lo_v[J])
+        area = np.clip(du, 0, None) * np.clip(dv, 0, None)
+        area_i[s:s + step] = area.sum(axis=1)
+        area_j += area.sum(axis=0)
+    return area_i, area_j
+
+
+def face_coverage(lo, size, truck_dims, walls=DEFAULT_WALLS, decimals=3):
+    """(n, 6) flags for whether each box face is fully covered by neighbours or a truck wall.
+
+    Face ``2 * axis`` is the low side and ``2 * axis + 1`` the high side. Only
+    boxes that touch in the same plane are compared, never all pairs.
+    """
+    lo = np.round(np.asarray(lo, dtype=float), decimals)
+    hi = np.round(lo + np.asarray(size, dtype=float), decimals)
+    truck_dims = np.round(np.asarray(truck_dims, dtype=float), decimals)
+    covered = np.zeros((len(lo), 6), dtype=bool)
+    for axis in range(3):
+        u, v = [a for a in range(3) if a != axis]
+        name = "xyz"[axis]
+        if name + "-" in walls:
+            covered[lo[:, axis] <= 0, 2 * axis] = True
+        if name + "+" in walls:
+            covered[hi[:, axis] >= truck_dims[axis], 2 * axis + 1] = True
+
+        face_area = (hi[:, u] - lo[:, u]) * (hi[:, v] - lo[:, v])
+        high_faces = _groups(hi[:, axis])
+        low_faces = _groups(lo[:, axis])
+        for plane in high_faces.keys() & low_faces.keys():
+            I, J = high_faces[plane], low_faces[plane]
+            area_i, area_j = _overlap_area(lo[:, u], hi[:, u], lo[:, v], hi[:, v], I, J)
+            covered[I, 2 * axis + 1] |= area_i >= face_area[I] * (1 - 1e-9)
+            covered[J, 2 * axis] |= area_j >= face_area[J] * (1 - 1e-9)
+    return covered
+
+
+def _merge_runs(faces, along, decimals):
+    """Merge faces that share a plane, type and cross extent and touch end to end along ``along``."""
+    if len(faces) == 0:
+        return faces
+    a0, a1 = (U0, U1) if along == "u" else (V0, V1)
+    c0, c1 = (V0, V1) if along == "u" else (U0, U1)
+    faces = faces[np.lexsort((faces[:, a0], faces[:, c1], faces[:, c0], faces[:, TYPE],
+                              faces[:, PLANE], faces[:, SIDE], faces[:, AXIS]))]
+    keys = faces[:, [AXIS, SIDE, PLANE, TYPE, c0, c1]]
+    same = np.all(keys[1:] == keys[:-1], axis=1)
+    touching = np.round(faces[1:, a0] - faces[:-1, a1], decimals) == 0
+    starts = np.flatnonzero(np.r_[True, ~(same & touching)])
+    ends = np.r_[starts[1:] - 1, len(faces) - 1]
+    merged = faces[starts].copy()
+    merged[:, a1] = faces[ends, a1]
+    return merged
+
+
+def visible_faces(d, truck_dims, walls=DEFAULT_WALLS, merge=True, decimals=3):
+    """Uncovered faces of the packed boxes in ``d``, merged into larger quads per box type.
+
+    Returns ``(faces, hidden, type_names)``, where ``hidden`` marks boxes whose
+    six faces are all covered.
+    """
+    lo = np.stack([d["xx"], d["yy"], d["zz"]], axis=1).astype(float)
+    size = np.stack([d["h"], d["w"], d["l"]], axis=1).astype(float)
+    covered = face_coverage(lo, size, truck_dims, walls, decimals)
+    hidden = covered.all(axis=1)
+
+    type_names, type_codes = np.unique(box_type(d["name"]), return_inverse=True)
+    box_idx, face_idx = np.nonzero(~covered)
+    axis, side = face_idx // 2, face_idx % 2
+    hi = lo + size
+    u_axis = np.where(axis == 0, 1, 0)
+    v_axis = np.where(axis == 2, 1, 2)
+    faces = np.column_stack([
+        axis,
+        side,
+        np.where(side == 1, hi[box_idx, axis], lo[box_idx, axis]),
+        type_codes[box_idx],
+        lo[box_idx, u_axis], hi[box_idx, u_axis],
+        lo[box_idx, v_axis], hi[box_idx, v_axis],
+    ]).astype(float)
+    if merge:
+        faces = _merge_runs(_merge_runs(faces, "u", decimals), "v", decimals)
+    return faces, hidden, type_names
+
+
+def faces_mesh(faces):
+    """Quad faces as Mesh3d vertex arrays, two triangles per quad."""
+    m = len(faces)
+    corners = np.empty((m, 4, 3))
+    for axis in range(3):
+        u, v = [a for a in range(3) if a != axis]
+        sel = faces[:, AXIS] == axis
+        f = faces[sel]
+        corners[sel, :, axis] = f[:, PLANE, None]
+        corners[sel, :, u] = f[:, [U0, U1, U1, U0]]
+        corners[sel, :, v] = f[:, [V0, V0, V1, V1]]
+    base = (np.arange(m) * 4)[:, None]
+    corners = corners.reshape(-1, 3)
+    return {
+        "x": corners[:, 0],
+        "y": corners[:, 1],
+        "z": corners[:, 2],
+        "i": (base + [0, 0]).ravel(),
+        "j": (base + [1, 2]).ravel(),
+        "k": (base + [2, 3]).ravel(),
+    }
+
+
+def lod_mesh_traces(d, truck_dims, colors=None, walls=DEFAULT_WALLS):
+    """Occlusion-culled alternative to ``box_mesh_traces``.
+
+    Boxes hidden on all six sides are dropped and the remaining visible faces
+    are merged into larger same-type quads. Returns ``(traces, hidden, stats)``
+    with triangle counts before and after.
+    """
+    faces, hidden, type_names = visible_faces(d, truck_dims, walls)
+    colors = colors or type_colors(type_names)
+    face_colors = np.array([colors[name] for name in type_names], dtype=object)[faces[:, TYPE].astype(int)]
+    trace = go.Mesh3d(
+        **faces_mesh(faces),
+        vertexcolor=np.repeat(face_colors, 4),
+        hovertext=np.repeat(type_names[faces[:, TYPE].astype(int)], 4),
+        hoverinfo="text",
+        flatshading=True,
+        showlegend=False,
+    )
+    stats = {
+        "boxes": len(d),
+        "hidden_boxes": int(hidden.sum()),
+        "triangles_full": 12 * len(d),
+        "triangles": 2 * len(faces),
+    }
+    return [trace], hidden, stats
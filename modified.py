@@ -3,35 +3,24 @@ import pandas as pd
 from py3dbp import Packer, Bin, Item
 import plotly.graph_objects as go
 import time
+from ingest import UPLOAD_TYPES, load_boxes, load_trucks
+from pack_cache import pack_cache, cache_key, file_digest
+from packing import build_containers, build_pbins, truck_names
+from render import box_edges, box_mesh_traces
+from lod import lod_mesh_traces
 
 # Assuming 'DATA_1000 1.xlsx' and 'trucks2_1.xlsx' are in the same directory as the script or uploaded by the user
 
 # Upload boxes data
-uploaded_boxes_file = st.file_uploader("Choose a file for boxes data", type=['xlsx'])
-if uploaded_boxes_file is not None:
-    boxes_df = pd.read_excel(uploaded_boxes_file)
-else:
+uploaded_boxes_file = st.file_uploader("Choose a file for boxes data", type=UPLOAD_TYPES)
+if uploaded_boxes_file is None:
     st.stop()
 
 # Upload trucks data
-uploaded_trucks_file = st.file_uploader("Choose a file for trucks data", type=['xlsx'])
-if uploaded_trucks_file is not None:
-    container_df = pd.read_excel(uploaded_trucks_file)
-else:
+uploaded_trucks_file = st.file_uploader("Choose a file for trucks data", type=UPLOAD_TYPES)
+if uploaded_trucks_file is None:
     st.stop()
 
-selected_df = boxes_df[['Box_ID', 'Box_Type', 'Box_Length', 'Box_Width', 'Box_Height', 'Box_Capcity']].copy()
-selected_df.columns = ['Item_Id', 'name', 'length', 'width', 'height', 'weight']
-
-# Process bins
-pbins = {
-    name: {
-        'n': group['name'].count(),
-        's': [group['length'].iloc[0], group['width'].iloc[0], group['height'].iloc[0], group['weight'].iloc[0]]
-    }
-    for name, group in selected_df.groupby('name')
-}
-
  
 # Example data for a single box in 3D space
 
@@ -47,107 +36,124 @@ def vertices(xmin=0, ymin=0, zmin=0, xmax=1, ymax=1, zmax=1):
         "k": [0, 7, 2, 3, 6, 7, 1, 6, 5, 5, 7, 2],
             }
 
-containers = container_df[['Truck_Length(Inch)', 'Truck_Width(Inch)', 'Truck_Height(Inch)']].values.tolist()
-available_trucks = ["Truck-" + str(i + 1) for i in range(len(containers))]
-
-# Streamlit selection box for trucks
-selected_truck = st.selectbox('Select Truck:', available_trucks)
+pack_params = {
+    "bigger_first": True,
+    "distribute_items": True,
+    "number_of_decimals": 3,
+    "max_weight": 18000.0,
+}
 
 # Function to pack items
-def pack_items(containers, pbins):
+def pack_items(containers, pbins, bigger_first=True, distribute_items=True, number_of_decimals=3, max_weight=18000.0):
     packed_data = []
     packer = Packer()
     for i, container in enumerate(containers):
         container_dims = [float(dim) for dim in container]
-        packer.add_bin(Bin("Truck-" + str(i + 1), *container_dims, 18000.0))
+        packer.add_bin(Bin("Truck-" + str(i + 1), *container_dims, max_weight))
 
     for name, cfg in pbins.items():
         for i in range(cfg["n"]):
             item_dims = [float(dim) for dim in cfg["s"]]
             packer.add_item(Item(f"{name}_{i}", *item_dims))
 
-    packer.pack(bigger_first=True, distribute_items=True, number_of_decimals=3)
+    packer.pack(bigger_first=bigger_first, distribute_items=distribute_items, number_of_decimals=number_of_decimals)
     return packer
 
-packer = pack_items(containers, pbins)
+# Read both uploads and pack them; only runs when the file contents or parameters change
+def load_and_pack():
+    boxes_df = load_boxes(uploaded_boxes_file)
+    container_df = load_trucks(uploaded_trucks_file)
+
+    pbins = build_pbins(boxes_df)
+
+    containers = build_containers(container_df)
+    return containers, pack_items(containers, pbins, **pack_params)
+
+pack_key = cache_key(file_digest(uploaded_boxes_file), file_digest(uploaded_trucks_file), **pack_params)
+containers, packer = pack_cache.get_or_compute(pack_key, load_and_pack)
+available_trucks = truck_names(containers)
+
+# Streamlit selection box for trucks
+selected_truck = st.selectbox('Select Truck:', available_trucks)
 
 # Plot function
-def plot_for_truck(selected_truck, containers):
-    df = pd.DataFrame(packed_data)
- 
-    # Filter by selected truck
-    df = df[df['bin_name'].str.contains(selected_truck)]
- x
-    # Create a figure for each container (bin)
-    for pbin, d in df.groupby("bin_name"):
-        fig = go.Figure()
+def plot_for_truck(selected_truck, containers, packer):
+    packed_data = []
+    for bin in packer.bins:
+        if bin.name == selected_truck:
+            for item in bin.items:
+                packed_data.append({
+                    "name": item.name,
+                    **{d: v for v, d in zip(item.get_dimension(), list("hwl"))},
+                    **{d + d: v for v, d in zip(item.position, list("xyz"))}
+                })
+
+    if not packed_data:
+        st.write("No data to display for selected truck.")
+        return
+    d = pd.DataFrame(packed_data)
+    fig = go.Figure()
  
-        # Add wireframe for the full truck dimensions (completely transparent)
-        truck_dimensions = [float(dim) for dim in containers[int(pbin.split("-")[1]) - 1]]
-        truck_outline = vertices(0, 0, 0, *truck_dimensions)
-        fig.add_trace(
-            go.Mesh3d(
-                x=truck_outline["x"],
-                y=truck_outline["y"],
-                z=truck_outline["z"],
-                i=truck_outline["i"],
-                j=truck_outline["j"],
-                k=truck_outline["k"],
-                opacity=0,  # Completely transparent
-                color='blue',
-                hoverinfo='skip'
-            )
+    # Add wireframe for the full truck dimensions (completely transparent)
+    truck_dimensions = [float(dim) for dim in containers[int(selected_truck.split("-")[1]) - 1]]
+    truck_outline = vertices(0, 0, 0, *truck_dimensions)
+    fig.add_trace(
+        go.Mesh3d(
+            x=truck_outline["x"],
+            y=truck_outline["y"],
+            z=truck_outline["z"],
+            i=truck_outline["i"],
+            j=truck_outline["j"],
+            k=truck_outline["k"],
+            opacity=0,  # Completely transparent
+            color='blue',
+            hoverinfo='skip'
         )
+    )
  
-        # Plot packed items and grid lines
-        xx = []
-        yy = []
-        zz = []
-        for _, r in d.iterrows():
-            fig.add_trace(
-                go.Mesh3d(r[["x", "y", "z", "i", "j", "k", "name", "color"]].to_dict())
-            )
-            xx += [r.xx, r.xx + r.h, r.xx + r.h, r.xx, r.xx, None] * 2 + [r.xx] * 5 + [None]
-            yy += [r.yy, r.yy, r.yy + r.w, r.yy + r.w, r.yy, None] * 2 + [
-                r.yy,
-                r.yy + r.w,
-                r.yy + r.w,
-                r.yy,
-                r.yy,
-                None,
-            ]
-            zz += [r.zz] * 5 + [None] + [r.zz + r.l] * 5 + [None] + [r.zz, r.zz, r.zz + r.l, r.zz + r.l, r.zz, None]
+    # Plot packed items and grid lines; boxes hidden inside the load are skipped unless asked for
+    if show_all_boxes:
+        fig.add_traces(box_mesh_traces(d))
+    else:
+        traces, hidden, lod_stats = lod_mesh_traces(d, truck_dimensions)
+        fig.add_traces(traces)
+        d = d[~hidden]
+        st.caption(f"{lod_stats['hidden_boxes']} of {lod_stats['boxes']} boxes hidden, "
+                   f"{lod_stats['triangles']} triangles instead of {lod_stats['triangles_full']}")
+    xx, yy, zz = box_edges(d["xx"], d["yy"], d["zz"], d["h"], d["w"], d["l"])
  
-        fig.add_trace(
-            go.Scatter3d(
-                x=xx,
-                y=yy,
-                z=zz,
-                mode="lines",
-                line_color="black",
-                line_width=2,
-                hoverinfo="skip",
-            )
+    fig.add_trace(
+        go.Scatter3d(
+            x=xx,
+            y=yy,
+            z=zz,
+            mode="lines",
+            line_color="black",
+            line_width=2,
+            hoverinfo="skip",
         )
+    )
  
-        # Configure and display the figure
-        ar = 4
-        xr = max(d["x"].max()) - min(d["x"].min())
-        aspect_ratio_x = ar
-        aspect_ratio_y = ((max(d["y"].max()) - min(d["y"].min())) / xr) * ar
-        aspect_ratio_z = ((max(d["z"].max()) - min(d["z"].min())) / xr) * ar
+    # Configure and display the figure
+    ar = 4
+    xr = truck_dimensions[0]
+    aspect_ratio_x = ar
+    aspect_ratio_y = (truck_dimensions[1] / xr) * ar
+    aspect_ratio_z = (truck_dimensions[2] / xr) * ar
  
-        fig.update_layout(
-            title={"text": pbin, "y": 0.9, "x": 0.5, "xanchor": "center", "yanchor": "top"},
-            margin={"l": 0, "r": 0, "t": 0, "b": 0},
-            scene=dict(
-                camera=dict(eye=dict(x=2, y=2, z=2)),
-                aspectratio=dict(x=aspect_ratio_x, y=aspect_ratio_y, z=aspect_ratio_z),
-                aspectmode="manual",
-            ),
-        )
+    fig.update_layout(
+        title={"text": selected_truck, "y": 0.9, "x": 0.5, "xanchor": "center", "yanchor": "top"},
+        margin={"l": 0, "r": 0, "t": 0, "b": 0},
+        scene=dict(
+            camera=dict(eye=dict(x=2, y=2, z=2)),
+            aspectratio=dict(x=aspect_ratio_x, y=aspect_ratio_y, z=aspect_ratio_z),
+            aspectmode="manual",
+        ),
+    )
  
-        fig.show()
+    st.plotly_chart(fig)
+
+show_all_boxes = st.sidebar.checkbox("Show all boxes (including ones hidden inside the load)")
 
 if st.button('Show Packing for Selected Truck'):
-    plot_for_truck(selected_truck, packer)
+    plot_for_truck(selected_truck, containers, packer)
@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from results import PackResult
+
+# Per-user, not the shared temp dir: whoever can write the cache files decides what the apps read back
+CACHE_ROOT = os.environ.get("PACKING_CACHE_DIR", os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "packing"))
+RESULT_CACHE_PATH = os.environ.get("PACKING_RESULT_CACHE", os.path.join(CACHE_ROOT, "results.sqlite"))
+RESULT_CACHE_VERSION = "2"  # bump when the cached value layout (e.g. PackResult) changes
+
+
+def check_owner(path):
+    """Raise PermissionError unless ``path`` belongs to the current user and no one else can write to it."""
+    if not hasattr(os, "getuid"):
+        return  # no POSIX owners; per-user cache dirs live under the user's profile
+    info = os.stat(path)
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is owned by another user")
+    if info.st_mode & 0o022:
+        raise PermissionError(f"{path} is writable by other users")
+
+
+def private_dir(path):
+    """Create ``path`` with mode 0700 if needed, then ``check_owner`` it; returns ``path``."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    check_owner(path)
+    return path
+
+
+def _plain(value):
+    if hasattr(value, "tolist"):
+        return value.tolist()  # numpy scalars and arrays
+    raise TypeError(f"{type(value).__name__} can't be stored as JSON")
+
+
+def dump_json(value):
+    """JSON bytes for a cache value made of dicts, lists, strings and numbers (tuples come back as lists)."""
+    return json.dumps(value, separators=(",", ":"), default=_plain).encode()
+
+
+def load_json(data):
+    return json.loads(data)
+
+
+def dump_plan(plan):
+    """``(containers, PackResult, report)`` as a JSON line with the containers and report, then the PackResult."""
+    containers, result, report = plan
+    return dump_json({"containers": containers, "report": report}) + b"\n" + result.to_bytes()
+
+
+def load_plan(data):
+    header, result = data.split(b"\n", 1)
+    header = load_json(header)
+    return header["containers"], PackResult.from_bytes(result), header["report"]
+
+
+def file_digest(uploaded_file):
+    """SHA-256 of an uploaded file's bytes (works for Streamlit uploads and open binary files)."""
+    if hasattr(uploaded_file, "getvalue"):
+        data = uploaded_file.getvalue()
+    else:
+        pos = uploaded_file.tell()
+        uploaded_file.seek(0)
+        data = uploaded_file.read()
+        uploaded_file.seek(pos)
+    return hashlib.sha256(data).hexdigest()
+
+
+def pbins_digest(pbins):
+    """SHA-256 of the grouped boxes, so one manifest hashes the same whatever its file format or row order."""
+    h = hashlib.sha256()
+    for name in sorted(pbins, key=str):
+        cfg = pbins[name]
+        h.update(f"{name}|{int(cfg['n'])}|{[float(v) for v in cfg['s']]}\n".encode())
+    return h.hexdigest()
+
+
+def containers_digest(containers):
+    """SHA-256 of the truck dimensions, in fleet order (trucks are named by position)."""
+    h = hashlib.sha256()
+    for container in containers:
+        h.update(f"{[float(dim) for dim in container]}\n".encode())
+    return h.hexdigest()
+
+
+def cache_key(boxes_digest, trucks_digest, **params):
+    """Combine the manifest digests and packing parameters into one cache key."""
+    h = hashlib.sha256()
+    h.update(boxes_digest.encode())
+    h.update(trucks_digest.encode())
+    for name in sorted(params):
+        h.update(f"|{name}={params[name]!r}".encode())
+    return h.hexdigest()
+
+
+class ResultStore:
+    """Packing results in a SQLite file, shared by worker processes and kept across restarts.
+
+    Values are written with ``dump`` and read back with ``load`` (plain JSON by
+    default, never pickle) and looked up by cache key. Once the stored values
+    exceed ``max_bytes``, the least recently used are deleted. SQLite's WAL
+    mode and busy timeout handle concurrent readers and writers; any storage
+    error turns into a cache miss rather than a failed pack. A file or
+    directory that another user owns or can write to is not used at all.
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, max_bytes=512 * 2**20, dump=dump_json, load=load_json):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dump = dump
+        self.load = load
+        try:
+            private_dir(os.path.dirname(os.path.abspath(path)))
+            if os.path.exists(path):
+                check_owner(path)
+        except OSError as exc:
+            warnings.warn(f"Not using the cache at {path}: {exc}")
+            self.path = None
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+                conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        except sqlite3.Error:
+            self.path = None  # unusable location; behave as an empty store
+
+    @contextmanager
+    def _connect(self):
+        # A connection per call: sqlite3 connections can't be shared between threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _key(self, key):
+        return f"{RESULT_CACHE_VERSION}:{key}"
+
+    def __contains__(self, key):
+        if self.path is None:
+            return False
+        try:
+            with self._connect() as conn:
+                return conn.execute("SELECT 1 FROM results WHERE key = ?", (self._key(key),)).fetchone() is not None
+        except sqlite3.Error:
+            return False
+
+    def __len__(self):
+        if self.path is None:
+            return 0
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    @property
+    def nbytes(self):
+        if self.path is None:
+            return 0
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def get(self, key, default=None):
+        if self.path is None:
+            return default
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value FROM results WHERE key = ?", (self._key(key),)).fetchone()
+                if row is None:
+                    return default
+                conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), self._key(key)))
+            return self.load(row[0])
+        except sqlite3.Error:
+            return default
+        except Exception:
+            self.discard(key)  # written by an incompatible version; drop it
+            return default
+
+    def put(self, key, value):
+        if self.path is None:
+            return
+        data = self.dump(value)
+        if len(data) > self.max_bytes:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")  # one writer at a time, so eviction sees a consistent total
+                conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                             (self._key(key), data, len(data), time.time()))
+                total = conn.execute("SELECT SUM(size) FROM results").fetchone()[0]
+                for old_key, size in conn.execute("SELECT key, size FROM results ORDER BY last_used").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                    total -= size
+        except sqlite3.Error:
+            pass
+
+    def discard(self, key):
+        if self.path is None:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM results WHERE key = ?", (self._key(key),))
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        if self.path is None:
+            return
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results")
+
+
+class PackCache:
+    """Bounded LRU cache of packing results shared by every session in the process.
+
+    With a ``store``, misses fall through to it and new results are written
+    to it, so other processes and later restarts see them too.
+    """
+
+    def __init__(self, max_entries=8, store=None):
+        self.max_entries = max_entries
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or (self.store is not None and key in self.store)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        sentinel = object()
+        value = sentinel if self.store is None else self.store.get(key, sentinel)
+        if value is sentinel:
+            with self._lock:
+                self.misses += 1
+            return default
+        self._remember(key, value)
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.store is not None:
+            self.store.put(key, value)
+
+    def get_or_compute(self, key, compute):
+        # Packing runs outside the lock so one slow manifest doesn't block other sessions
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.store is not None:
+            self.store.clear()
+
+
+# Streamlit re-executes the app script on every widget change but keeps imported
+# modules alive, so this instance survives reruns.
+pack_cache = PackCache()
+
+# PackResult values for streamlit.py, also kept on disk for other processes and restarts.
+# Separate from pack_cache because the other apps cache differently shaped values.
+result_cache = PackCache(store=ResultStore(dump=dump_plan, load=load_plan))
@@ -0,0 +1,79 @@
+import base64
+import io
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+from ingest import BOX_COLUMNS, HAS_PYARROW, TRUCK_COLUMNS
+from packing import PackingCancelled
+
+# Where pack_service.py listens; unset means pack in-process
+SERVICE_URL = os.environ.get("PACKING_SERVICE_URL")
+
+
+class PackServiceError(RuntimeError):
+    pass
+
+
+def encode_table(df, columns):
+    """A manifest as the service reads it: base64 Parquet, or row objects without pyarrow."""
+    df = df[list(columns)]
+    if HAS_PYARROW:
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        return {"parquet": base64.b64encode(buffer.getvalue()).decode("ascii")}
+    return json.loads(df.to_json(orient="records"))
+
+
+def pack_remote(url, boxes_df, trucks_df, timeout=None, stop=None, **params):
+    """``pack_items`` records for these manifests, packed by the service at ``url``.
+
+    ``params`` are ``pack_items`` arguments plus ``presolve``. Raises
+    PackServiceError when the service rejects the request or can't be reached.
+    Setting the ``stop`` event abandons the request and raises
+    ``PackingCancelled``; the service still finishes packing it.
+    """
+    body = json.dumps({
+        "boxes": encode_table(boxes_df, BOX_COLUMNS),
+        "trucks": encode_table(trucks_df, TRUCK_COLUMNS),
+        "params": params,
+    }).encode()
+    request = urllib.request.Request(url.rstrip("/") + "/pack", data=body, method="POST",
+                                     headers={"Content-Type": "application/json"})
+    if stop is None:
+        return _send(request, url, timeout)
+
+    # urlopen can't be interrupted, so it waits in a daemon thread that is left behind on ``stop``
+    outcome = {}
+
+    def send():
+        try:
+            outcome["records"] = _send(request, url, timeout)
+        except Exception as exc:
+            outcome["error"] = exc
+
+    thread = threading.Thread(target=send, name="pack-remote", daemon=True)
+    thread.start()
+    while thread.is_alive():
+        if stop.is_set():
+            raise PackingCancelled("service")
+        thread.join(0.2)
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["records"]
+
+
+def _send(request, url, timeout):
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)["packed_data"]
+    except urllib.error.HTTPError as exc:
+        try:
+            message = json.load(exc).get("error", exc.reason)
+        except ValueError:
+            message = exc.reason
+        raise PackServiceError(f"packing service: {message}") from exc
+    except urllib.error.URLError as exc:
+        raise PackServiceError(f"packing service unreachable at {url}: {exc.reason}") from exc
@@ -0,0 +1,189 @@
+"""Local packing service: one warm pool of packing processes shared by every app instance.
+
+    python pack_service.py --port 8765 --workers 4
+
+``POST /pack`` takes ``{"boxes": <table>, "trucks": <table>, "params": {...}}``,
+where a table is a list of row objects with the manifest columns or
+``{"parquet": "<base64>"}``, and ``params`` are ``pack_items`` arguments (plus
+``presolve``). It answers ``{"packed_data": [...], "seconds": s, "coalesced": bool}``
+with records in the ``pack_items`` schema. Requests for the same load and
+parameters that arrive while it is being packed wait for that run instead of
+starting another. ``GET /health`` reports the pool and request counters.
+
+Point the Streamlit app at it with ``PACKING_SERVICE_URL=http://127.0.0.1:8765``.
+"""
+import argparse
+import asyncio
+import base64
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from fleet import pack_presolved
+from ingest import BOX_COLUMNS, TRUCK_COLUMNS, parse_manifest
+from pack_cache import cache_key, containers_digest, pbins_digest
+from packing import ENGINES, build_containers, build_pbins, pack_items
+
+MAX_BODY = 512 * 2**20
+# Everything pack_items takes from a caller, plus the fleet pre-solver switch
+PACK_PARAMS = set(inspect.signature(pack_items).parameters) - {"containers", "pbins", "progress", "stop"} | {"presolve"}
+
+
+def _warm_up():
+    # Runs once per worker, so the first real request doesn't pay for imports and first-call setup
+    pack_items([[10, 10, 10]], {"warm-up": {"n": 2, "s": [1, 1, 1, 1]}})
+
+
+def _ready():
+    return os.getpid()
+
+
+def run_pack(containers, pbins, params):
+    """Pack in a worker and return the records already encoded, so the event loop only forwards bytes."""
+    params = dict(params)
+    if params.pop("presolve", False) and params.get("engine") != "portfolio":
+        packed_data, _ = pack_presolved(containers, pbins, **params)
+    else:
+        packed_data = pack_items(containers, pbins, **params)
+    return json.dumps(packed_data, default=float).encode()
+
+
+def read_table(table, columns):
+    """A manifest table from a request: row objects or base64 Parquet, reduced to ``columns``."""
+    if isinstance(table, dict) and "parquet" in table:
+        return parse_manifest(base64.b64decode(table["parquet"]), "parquet", columns)
+    if not isinstance(table, list):
+        raise ValueError("a table is a list of rows or {\"parquet\": <base64>}")
+    df = pd.DataFrame(table)
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ValueError(f"missing columns {missing}")
+    return df[list(columns)].astype(columns)
+
+
+def decode_request(body):
+    """(containers, pbins, params) from a /pack request body; ValueError for a bad request."""
+    try:
+        request = json.loads(body)
+        boxes_df = read_table(request["boxes"], BOX_COLUMNS)
+        trucks_df = read_table(request["trucks"], TRUCK_COLUMNS)
+    except (KeyError, TypeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"bad request: {exc}") from exc
+    params = request.get("params") or {}
+    unknown = set(params) - PACK_PARAMS
+    if unknown:
+        raise ValueError(f"unknown params {sorted(unknown)}")
+    # pack_items runs py3dbp for any engine it doesn't know, which would look like a successful pack
+    if "engine" in params and params["engine"] not in ENGINES:
+        raise ValueError(f"unknown engine {params['engine']!r}; expected one of {ENGINES}")
+    return build_containers(trucks_df), build_pbins(boxes_df), params
+
+
+class PackService:
+    """Asyncio HTTP front end over a process pool, with identical in-flight requests coalesced."""
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up)
+        self.in_flight = {}
+        self.stats = {"requests": 0, "packed": 0, "coalesced": 0, "failed": 0}
+
+    async def warm(self):
+        """Start every worker now rather than on the first requests."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _ready) for _ in range(self.workers)))
+
+    async def pack(self, containers, pbins, params):
+        """Encoded records for this load, and whether they came from a run already in flight."""
+        key = cache_key(pbins_digest(pbins), containers_digest(containers), **params)
+        future = self.in_flight.get(key)
+        coalesced = future is not None
+        if coalesced:
+            self.stats["coalesced"] += 1
+        else:
+            future = asyncio.get_running_loop().run_in_executor(self.pool, run_pack, containers, pbins, params)
+            self.in_flight[key] = future
+            future.add_done_callback(lambda f: self.in_flight.pop(key) if self.in_flight.get(key) is f else None)
+        # Shielded: a client hanging up must not cancel a run other clients are waiting on
+        return await asyncio.shield(future), coalesced
+
+    async def route(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, json.dumps({"workers": self.workers, "in_flight": len(self.in_flight), **self.stats}).encode()
+        if method != "POST" or path != "/pack":
+            return 404, json.dumps({"error": f"no route {method} {path}"}).encode()
+        self.stats["requests"] += 1
+        start = time.perf_counter()
+        try:
+            containers, pbins, params = await asyncio.to_thread(decode_request, body)
+        except ValueError as exc:
+            self.stats["failed"] += 1
+            return 400, json.dumps({"error": str(exc)}).encode()
+        try:
+            records, coalesced = await self.pack(containers, pbins, params)
+        except Exception as exc:
+            self.stats["failed"] += 1
+            return 500, json.dumps({"error": f"{type(exc).__name__}: {exc}"}).encode()
+        if not coalesced:
+            self.stats["packed"] += 1
+        tail = json.dumps({"seconds": time.perf_counter() - start, "coalesced": coalesced})
+        return 200, b'{"packed_data": ' + records + b", " + tail[1:].encode()
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1")
+            method, path, _ = request_line.split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY:
+                status, payload = 413, json.dumps({"error": "request too large"}).encode()
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.route(method, path.split("?")[0], body)
+        except (ValueError, asyncio.IncompleteReadError):
+            status, payload = 400, json.dumps({"error": "malformed HTTP request"}).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large"}.get(status, "Error")
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        await self.warm()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Packing service on http://{host}:{port} with {self.workers} workers", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="keep the default to serve this machine only")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="packing processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+    service = PackService(args.workers)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.pool.shutdown(cancel_futures=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
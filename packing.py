@@ -0,0 +1,160 @@
+import os
+
+import numpy as np
+import pandas as pd
+from py3dbp import Packer, Bin
+
+from block_packer import pack_blocks
+from compact import BoxType, CompactItem, box_arrays
+from ep_packer import pack_extreme_points
+from fixed_point import pack_fixed_point
+from ingest import CACHE_DIR, load_boxes, load_trucks
+from patterns import pattern_library
+
+ENGINES = ["py3dbp", "fixed-point", "blocks", "extreme-points"]
+TRUCK_DIMENSIONS = ['Truck_Length(Inch)', 'Truck_Width(Inch)', 'Truck_Height(Inch)']
+EXPORT_COLUMNS = ["bin_name", "name", "h", "w", "l", "xx", "yy", "zz"]
+
+
+class PackingCancelled(Exception):
+    """Raised by ``pack_items`` once its ``stop`` event is set."""
+
+
+def build_pbins(boxes_df):
+    """Group a box manifest by Box_Type into {type: {"n": count, "s": [length, width, height, weight]}}."""
+    selected_df = boxes_df[['Box_ID', 'Box_Type', 'Box_Length', 'Box_Width', 'Box_Height', 'Box_Capcity']].copy()
+    selected_df.columns = ['Item_Id', 'name', 'length', 'width', 'height', 'weight']
+
+    return {
+        name: {
+            'n': group['name'].count(),
+            's': [group['length'].iloc[0], group['width'].iloc[0], group['height'].iloc[0], group['weight'].iloc[0]]
+        }
+        for name, group in selected_df.groupby('name', observed=True)
+    }
+
+
+def build_containers(trucks_df):
+    """Truck manifest as a list of [length, width, height]."""
+    return trucks_df[TRUCK_DIMENSIONS].values.tolist()
+
+
+def truck_names(containers):
+    return ["Truck-" + str(i + 1) for i in range(len(containers))]
+
+
+# Function to pack items
+def pack_items(containers, pbins, engine="py3dbp", bigger_first=True, distribute_items=True, number_of_decimals=3,
+               max_weight=18000.0, sort_by="volume", upright=False, resolution=None, patterns=True, min_support=0.0,
+               progress=None, stop=None):
+    """Pack the boxes in ``pbins`` into ``containers`` and return one record per packed box.
+
+    ``sort_by`` and ``upright`` only apply to the "blocks" and "extreme-points"
+    engines; py3dbp always orders by volume and tries every rotation.
+    "fixed-point" is py3dbp's algorithm on integer coordinates in units of
+    1/``resolution`` (default ``10**number_of_decimals``, which gives the same
+    placements as py3dbp's Decimal arithmetic). With ``patterns`` the "blocks"
+    engine reuses wall patterns from the shared ``pattern_library()``, or from
+    ``patterns`` itself when it is a library (a ``PackCache``), e.g. an empty
+    one for runs that must not depend on earlier ones. With
+    ``min_support`` the "extreme-points" engine only places a box above the
+    floor where at least that share of its footprint is supported.
+    ``progress(bin_name, records)`` is called as each truck is finished, with
+    that truck's records. Setting the ``stop`` event (a ``threading.Event``)
+    raises ``PackingCancelled``: between boxes for py3dbp, between trucks for
+    the faster engines.
+    """
+    def report(bin_name, records):
+        if stop is not None and stop.is_set():
+            raise PackingCancelled(bin_name)
+        if progress is not None:
+            progress(bin_name, records)
+
+    if engine == "blocks":
+        library = pattern_library() if patterns is True else (None if patterns is False else patterns)
+        return pack_blocks(containers, pbins, bigger_first=bigger_first, max_weight=max_weight,
+                           number_of_decimals=number_of_decimals, sort_by=sort_by, upright=upright,
+                           patterns=library, progress=report)
+    if engine == "fixed-point":
+        return pack_fixed_point(containers, pbins, bigger_first=bigger_first, distribute_items=distribute_items,
+                                max_weight=max_weight, resolution=resolution or 10 ** number_of_decimals,
+                                progress=report)
+    if engine == "extreme-points":
+        return pack_extreme_points(containers, pbins, bigger_first=bigger_first, distribute_items=distribute_items,
+                                   max_weight=max_weight, number_of_decimals=number_of_decimals,
+                                   sort_by=sort_by, upright=upright, min_support=min_support, progress=report)
+
+    packer = Packer()
+    for i, container in enumerate(containers):
+        container_dims = [float(dim) for dim in container]
+        packer.add_bin(Bin("Truck-" + str(i + 1), *container_dims, max_weight))
+
+    # Boxes of a type share one BoxType; boxes waiting to be packed are just (type, k) array entries
+    box_types = [BoxType(name, *cfg["s"], number_of_decimals) for name, cfg in pbins.items()]
+    item_type, item_k = box_arrays([cfg["n"] for cfg in pbins.values()], [t.volume for t in box_types], bigger_first)
+
+    # The same steps as Packer.pack, one truck at a time so progress can be reported
+    for bin in packer.bins:
+        bin.format_numbers(number_of_decimals)
+    packer.bins.sort(key=lambda bin: bin.get_volume(), reverse=bigger_first)
+
+    packed_data = []  # Store the packing results in a local variable
+    item = None
+    for i, bin in enumerate(packer.bins):
+        placed = np.zeros(len(item_type), dtype=bool)
+        for j, (t, k) in enumerate(zip(item_type.tolist(), item_k.tolist())):
+            if stop is not None and stop.is_set():
+                raise PackingCancelled(bin.name)
+            # Only a box that gets placed keeps its CompactItem; a failed attempt's one is reused
+            if item is None:
+                item = CompactItem(box_types[t], k)
+            else:
+                item.reset(box_types[t], k)
+            packer.pack_to_bin(bin, item)
+            if bin.items and bin.items[-1] is item:
+                placed[j] = True
+                item = None
+        bin.unfitted_items.clear()  # every entry would be the reused item
+        if distribute_items:
+            item_type, item_k = item_type[~placed], item_k[~placed]
+
+        start = len(packed_data)
+        for placed_item in bin.items:
+            packed_data.append({
+                "bin_name": bin.name,
+                "bin_index": i,  # Use loop variable i instead of non-existent bin.index
+                "name": placed_item.name,
+                **{d: v for v, d in zip(placed_item.get_dimension(), list("hwl"))},
+                **{d + d: v for v, d in zip(placed_item.position, list("xyz"))}
+            })
+        report(bin.name, packed_data[start:])
+    return packed_data
+
+
+def pack_manifests(boxes_source, trucks_source, cache_dir=CACHE_DIR, **pack_params):
+    """Read a box and a truck manifest and pack them, without any Streamlit calls.
+
+    Returns ``(boxes_df, containers, packed_data)``; ``pack_params`` are passed
+    on to ``pack_items``.
+    """
+    boxes_df = load_boxes(boxes_source, cache_dir=cache_dir)
+    containers = build_containers(load_trucks(trucks_source, cache_dir=cache_dir))
+    packed_data = pack_items(containers, build_pbins(boxes_df), **pack_params)
+    return boxes_df, containers, packed_data
+
+
+def export_records(packed_data, path):
+    """Write packed records to ``path`` as csv, parquet or json, chosen by extension."""
+    df = pd.DataFrame(packed_data, columns=EXPORT_COLUMNS)
+    # py3dbp gives Decimals, and int 0 for coordinates at the origin; the other engines give floats.
+    # Write every engine's geometry as plain floats
+    geometry = [col for col in EXPORT_COLUMNS if col not in ("bin_name", "name")]
+    df[geometry] = df[geometry].astype("float64")
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        df.to_parquet(path, index=False)
+    elif ext == ".json":
+        df.to_json(path, orient="records", indent=2)
+    else:
+        df.to_csv(path, index=False)
+    return df
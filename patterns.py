@@ -0,0 +1,142 @@
+import bisect
+import os
+import threading
+
+from pack_cache import CACHE_ROOT, PackCache, ResultStore
+
+PATTERN_LIBRARY_PATH = os.environ.get("PACKING_PATTERN_LIBRARY", os.path.join(CACHE_ROOT, "patterns.sqlite"))
+PATTERN_VERSION = "1"  # bump when wall_pattern changes, so stored patterns are recomputed
+MAX_RASTER = 64  # cut positions per side beyond which a wall is only searched as a plain grid
+EPS = 1e-9
+
+
+def _raster(limit, sizes):
+    """Sorted sums of ``sizes`` up to ``limit``: the only cut positions a guillotine layout needs."""
+    points = {0.0}
+    frontier = [0.0]
+    while frontier and len(points) <= MAX_RASTER:
+        p = frontier.pop()
+        for size in sizes:
+            q = round(p + size, 6)
+            if q <= limit + EPS and q not in points:
+                points.add(q)
+                frontier.append(q)
+    return sorted(points)
+
+
+def wall_layout(width, height, p, q, rotate=True):
+    """Most ``p`` x ``q`` rectangles (also ``q`` x ``p`` if ``rotate``) in ``width`` x ``height``.
+
+    A guillotine search over cut positions across the width: every region is
+    a plain grid or cut into two side-by-side columns. Only cutting across
+    the width keeps every box standing on the floor or squarely on the box
+    below, as a cut across the height would stack a region on the ragged top
+    of another. Returns ``(rects, free)``, both as (y, z, b, c) rectangles;
+    ``free`` are the parts left empty.
+    """
+    shapes = [(p, q), (q, p)] if rotate and p != q else [(p, q)]
+    rw = _raster(width, {a for a, _ in shapes})
+    search = len(rw) <= MAX_RASTER
+    if not search:
+        rw = [0.0, float(width)]
+    memo = {}
+
+    def floor(points, x):
+        return points[bisect.bisect_right(points, x + EPS) - 1]
+
+    def solve(w):
+        if w in memo:
+            return memo[w][0]
+        best = (0, None)
+        for a, b in shapes:
+            n = int((w + EPS) // a) * int((height + EPS) // b)
+            if n > best[0]:
+                best = (n, ("grid", a, b))
+        if search and best[0]:
+            for x in rw[1:]:
+                if x > w / 2 + EPS:
+                    break
+                n = solve(x) + solve(floor(rw, w - x))
+                if n > best[0]:
+                    best = (n, ("y", x))
+        memo[w] = best
+        return best[0]
+
+    rects, free = [], []
+
+    def expand(y, z, w, h):
+        solve(floor(rw, w))
+        how = memo[floor(rw, w)][1]
+        if how is None:
+            free.append((y, z, w, h))
+        elif how[0] == "grid":
+            _, a, b = how
+            ny, nz = int((w + EPS) // a), int((h + EPS) // b)
+            rects.extend((y + j * a, z + k * b, a, b) for k in range(nz) for j in range(ny))
+            if w - ny * a > EPS:
+                free.append((y + ny * a, z, w - ny * a, h))
+            if h - nz * b > EPS:
+                free.append((y, z + nz * b, ny * a, h - nz * b))
+        else:
+            expand(y, z, how[1], h)
+            expand(y + how[1], z, w - how[1], h)
+
+    expand(0.0, 0.0, float(width), float(height))
+    return rects, free
+
+
+def wall_pattern(width, height, dims, upright=False):
+    """Best wall of one box type across a ``width`` x ``height`` truck cross-section.
+
+    Each axis of the box is tried as the depth along the truck, keeping the
+    one with the most boxes per unit of depth. Returns a dict with ``depth``,
+    ``boxes`` (y, z, b, c placements in the wall) and ``free`` rectangles.
+    """
+    best = None
+    for i in (0, 1) if upright else (0, 1, 2):
+        depth = float(dims[i])
+        p, q = (float(dims[1 - i]), float(dims[2])) if upright else [float(dims[j]) for j in range(3) if j != i]
+        rects, free = wall_layout(width, height, p, q, rotate=not upright)
+        if rects and (best is None or len(rects) / depth > len(best["boxes"]) / best["depth"] + EPS):
+            best = {"depth": depth, "boxes": rects, "free": free}
+    return best
+
+
+def _normalized(dims, upright=False):
+    """Box dimensions in an order that doesn't change the allowed orientations, so equal boxes share a key."""
+    dims = [round(float(dim), 3) for dim in dims[:3]]
+    return sorted(dims[:2]) + dims[2:] if upright else sorted(dims)
+
+
+def pattern_key(width, height, dims, upright=False):
+    return (f"pattern:{PATTERN_VERSION}:{round(float(width), 3)}x{round(float(height), 3)}:"
+            f"{_normalized(dims, upright)}:{bool(upright)}")
+
+
+def lookup_pattern(library, width, height, dims, upright=False):
+    """Stored wall pattern for this cross-section and box, computed and stored on a miss (None if it can't fit)."""
+    return library.get_or_compute(
+        pattern_key(width, height, dims, upright),
+        lambda: wall_pattern(width, height, _normalized(dims, upright), upright) or {}) or None
+
+
+def library_stats(library):
+    """Lookups served from the library and patterns computed on a miss, in this process, and patterns stored."""
+    return {"hits": library.hits, "misses": library.misses,
+            "stored": len(library.store) if library.store is not None else len(library)}
+
+
+_library = None
+_library_lock = threading.Lock()
+
+
+def pattern_library():
+    """The library shared by every session and, through the SQLite file, by worker processes and later runs.
+
+    Created on first use, so importing the packers doesn't open the file.
+    """
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = PackCache(max_entries=4096, store=ResultStore(PATTERN_LIBRARY_PATH, max_bytes=64 * 2**20))
+        return _library
@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import queue
+import time
+
+from packing import PackingCancelled, pack_items
+
+# Every strategy distributes items: with distribute_items=False py3dbp packs the
+# same box into several trucks, which is not a plan we could load. The slow py3dbp
+# runs go last so on small machines they don't hold every worker past the budget.
+DEFAULT_STRATEGIES = [
+    {"engine": "blocks", "bigger_first": True},
+    {"engine": "blocks", "bigger_first": True, "sort_by": "footprint"},
+    {"engine": "blocks", "bigger_first": True, "upright": True},
+    {"engine": "extreme-points", "bigger_first": True},
+    {"engine": "extreme-points", "bigger_first": False},
+    {"engine": "extreme-points", "bigger_first": True, "sort_by": "footprint"},
+    {"engine": "extreme-points", "bigger_first": False, "sort_by": "footprint"},
+    {"engine": "extreme-points", "bigger_first": True, "upright": True},
+    {"engine": "py3dbp", "bigger_first": True},
+    {"engine": "py3dbp", "bigger_first": False},
+]
+
+OBJECTIVES = ["utilization", "unpacked", "first"]
+
+
+def strategy_name(strategy):
+    return ", ".join(f"{k}={v}" for k, v in strategy.items())
+
+
+def run_strategy(containers, pbins, strategy, max_weight):
+    """Worker entry point; returns the packing and how long it took."""
+    start = time.perf_counter()
+    packed_data = pack_items(containers, pbins, max_weight=max_weight, **strategy)
+    return packed_data, time.perf_counter() - start
+
+
+def score(packed_data, containers, pbins):
+    """Utilization (packed volume / fleet volume) and number of boxes left unpacked."""
+    fleet_volume = sum(float(c[0]) * float(c[1]) * float(c[2]) for c in containers)
+    packed_volume = sum(float(r["h"]) * float(r["w"]) * float(r["l"]) for r in packed_data)
+    total = sum(int(cfg["n"]) for cfg in pbins.values())
+    return {
+        "utilization": packed_volume / fleet_volume if fleet_volume else 0.0,
+        "unpacked": total - len(packed_data),
+    }
+
+
+def run_portfolio(containers, pbins, objective="utilization", budget=None, strategies=None, max_weight=18000.0,
+                  max_workers=None, stop=None):
+    """Run several packing strategies in parallel and keep the best result.
+
+    ``objective`` is "utilization" (most volume loaded), "unpacked" (fewest boxes
+    left over) or "first" (whichever strategy finishes first). With a ``budget``
+    in seconds, strategies still running at the deadline are abandoned and the
+    best finished one wins. Setting the ``stop`` event (a ``threading.Event``)
+    terminates the pool and raises ``PackingCancelled``. Returns
+    ``(packed_data, report)``, where ``report`` has one entry per strategy,
+    best first.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective {objective!r}; expected one of {OBJECTIVES}")
+    strategies = strategies or DEFAULT_STRATEGIES
+    max_workers = max_workers or min(len(strategies), os.cpu_count() or 1)
+
+    done = queue.Queue()  # (strategy index, result, exception), filled by the pool's result thread
+    pool = multiprocessing.Pool(processes=max_workers)
+    try:
+        for n, strategy in enumerate(strategies):
+            pool.apply_async(run_strategy, (containers, pbins, strategy, max_weight),
+                             callback=lambda value, n=n: done.put((n, value, None)),
+                             error_callback=lambda exc, n=n: done.put((n, None, exc)))
+        deadline = None if budget is None else time.monotonic() + budget
+        finished, failed = {}, {}
+        while len(finished) + len(failed) < len(strategies):
+            if stop is not None and stop.is_set():
+                raise PackingCancelled("portfolio")
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if stop is not None:
+                timeout = 0.2 if timeout is None else min(timeout, 0.2)  # wake up to check ``stop``
+            try:
+                n, value, exc = done.get(timeout=timeout)
+            except queue.Empty:
+                if deadline is None or time.monotonic() < deadline:
+                    continue
+                break  # out of budget
+            if exc is None:
+                finished[n] = value
+            else:
+                failed[n] = exc
+            if objective == "first" and finished:
+                break
+    finally:
+        # Drop queued strategies and stop the ones still running so they don't keep burning CPU
+        pool.terminate()
+        pool.join()
+
+    report = []
+    for n, strategy in enumerate(strategies):
+        entry = {"strategy": strategy_name(strategy)}
+        if n in finished:
+            packed_data, elapsed = finished[n]
+            entry.update(score(packed_data, containers, pbins), elapsed=elapsed, status="done")
+            entry["packed_data"] = packed_data
+        elif n in failed:
+            entry["status"] = f"failed: {failed[n]}"
+        else:
+            entry["status"] = "not finished"
+        report.append(entry)
+
+    completed = [e for e in report if e["status"] == "done"]
+    if not completed:
+        raise TimeoutError("No packing strategy finished within the budget")
+    if objective == "first":
+        best = min(completed, key=lambda e: e["elapsed"])
+    elif objective == "unpacked":
+        best = min(completed, key=lambda e: (e["unpacked"], -e["utilization"]))
+    else:
+        best = max(completed, key=lambda e: (e["utilization"], -e["unpacked"]))
+
+    report.sort(key=lambda e: (e is not best, e["status"] != "done", -e.get("utilization", 0.0)))
+    packed_data = best["packed_data"]
+    for entry in report:
+        entry.pop("packed_data", None)
+    return packed_data, report
@@ -0,0 +1,122 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class StageProfiler:
+    """Opt-in wall time, CPU time and peak allocation per pipeline stage.
+
+    Use ``with profiler.stage("pack", boxes=n) as counts:`` around each stage;
+    extra counts can be added to the yielded dict inside the block. When
+    disabled, ``stage`` does nothing, so the instrumentation can stay in place.
+    CPU time is the calling thread's, so stages timed in other threads at the
+    same time don't add to it; work in other processes (portfolio workers,
+    the packing service) only shows in the wall time.
+    """
+
+    def __init__(self, enabled=False, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.stages = []
+        self._stack = []
+        self._origin = time.perf_counter()
+        self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name, **counts):
+        if not self.enabled:
+            yield counts
+            return
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+        record = {"name": name, "depth": len(self._stack), "counts": counts}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                parent = self._stack[-1]
+                parent["_peak"] = max(parent["_peak"], peak)
+            tracemalloc.reset_peak()
+            record["_start_mem"] = record["_peak"] = current
+        self._stack.append(record)
+        record["start"] = time.perf_counter() - self._origin
+        cpu_start = time.thread_time()
+        try:
+            yield counts
+        finally:
+            record["wall_seconds"] = time.perf_counter() - self._origin - record["start"]
+            record["cpu_seconds"] = time.thread_time() - cpu_start
+            self._stack.pop()
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                record["_peak"] = max(record["_peak"], peak)
+                record["peak_alloc_bytes"] = record["_peak"] - record.pop("_start_mem")
+                if self._stack:
+                    self._stack[-1]["_peak"] = max(self._stack[-1]["_peak"], record["_peak"])
+                del record["_peak"]
+            self.stages.append(record)
+            if not self._stack and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def merge(self, other, depth=0):
+        """Add the stages ``other`` recorded, e.g. in a worker thread, on this profiler's timeline.
+
+        ``depth`` is added to their nesting, to show them under an open stage.
+        """
+        if not self.enabled:
+            return
+        shift = other._origin - self._origin
+        self.stages.extend({**s, "start": s["start"] + shift, "depth": s["depth"] + depth} for s in other.stages)
+
+    def rows(self):
+        """One flat dict per stage, in start order."""
+        return [
+            {
+                "stage": "  " * s["depth"] + s["name"],
+                "wall_s": round(s["wall_seconds"], 4),
+                "cpu_s": round(s["cpu_seconds"], 4),
+                "peak_alloc_mb": round(s.get("peak_alloc_bytes", 0) / 1e6, 2),
+                **s["counts"],
+            }
+            for s in sorted(self.stages, key=lambda s: s["start"])
+        ]
+
+    def to_json(self):
+        return json.dumps({"stages": sorted(self.stages, key=lambda s: s["start"])}, indent=2, default=str)
+
+    def to_chrome_trace(self):
+        """Stages as complete ("X") events for chrome://tracing or Perfetto."""
+        events = [
+            {
+                "name": s["name"],
+                "ph": "X",
+                "ts": s["start"] * 1e6,
+                "dur": s["wall_seconds"] * 1e6,
+                "pid": os.getpid(),
+                "tid": 1,
+                "args": {
+                    "cpu_seconds": s["cpu_seconds"],
+                    "peak_alloc_bytes": s.get("peak_alloc_bytes"),
+                    **s["counts"],
+                },
+            }
+            for s in self.stages
+        ]
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str)
+
+    def render(self, st):
+        """Collapsible sidebar panel with the stage table and export buttons."""
+        if not self.enabled or not self.stages:
+            return
+        import pandas as pd
+
+        with st.sidebar.expander("Stage profile", expanded=False):
+            st.dataframe(pd.DataFrame(self.rows()), hide_index=True)
+            st.download_button("Download JSON", self.to_json(), file_name="stage_profile.json",
+                               mime="application/json")
+            st.download_button("Download Chrome trace", self.to_chrome_trace(), file_name="stage_profile.trace.json",
+                               mime="application/json")
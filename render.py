@@ -0,0 +1,107 @@
+import numpy as np
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+
+# Corner layout and triangles of one box, matching vertices() in the apps
+CORNER_X = np.array([0, 0, 1, 1, 0, 0, 1, 1], dtype=bool)
+CORNER_Y = np.array([0, 1, 1, 0, 0, 1, 1, 0], dtype=bool)
+CORNER_Z = np.array([0, 0, 0, 0, 1, 1, 1, 1], dtype=bool)
+TRI_I = np.array([7, 0, 0, 0, 4, 4, 6, 1, 4, 0, 3, 6])
+TRI_J = np.array([3, 4, 1, 2, 5, 6, 5, 2, 0, 1, 6, 3])
+TRI_K = np.array([0, 7, 2, 3, 6, 7, 1, 6, 5, 5, 7, 2])
+
+# The wireframe the apps have always drawn per box: bottom loop, top loop and the
+# x-min side loop as corner indices into the layout above, -1 marking a line break
+OUTLINE_PATH = np.array([0, 3, 2, 1, 0, -1, 4, 7, 6, 5, 4, -1, 0, 1, 5, 4, 0, -1])
+# All 12 edges as (low corner, high corner) pairs, so a shared edge has the same key in both boxes
+EDGE_A = np.array([0, 3, 0, 1, 4, 7, 4, 5, 0, 1, 2, 3])
+EDGE_B = np.array([1, 2, 3, 2, 5, 6, 7, 6, 4, 5, 6, 7])
+
+PALETTE = qualitative.Plotly + qualitative.D3 + qualitative.Set3
+
+
+def box_type(names):
+    """Box_Type of each packed record; items are named <Box_Type>_<k>."""
+    return np.array([str(name).rsplit("_", 1)[0] for name in names])
+
+
+def type_colors(type_names):
+    """Stable colour per box type, so a type looks the same in every truck."""
+    return {name: PALETTE[n % len(PALETTE)] for n, name in enumerate(sorted(set(type_names)))}
+
+
+def box_vertices(xx, yy, zz, h, w, l):
+    """Vectorized vertices(): corner coordinates and triangle indices for many boxes at once.
+
+    Returns x, y, z with 8 entries per box and i, j, k with 12 triangles per box.
+    """
+    x0 = np.asarray(xx, dtype=float)[:, None]
+    y0 = np.asarray(yy, dtype=float)[:, None]
+    z0 = np.asarray(zz, dtype=float)[:, None]
+    x = np.where(CORNER_X, x0 + np.asarray(h, dtype=float)[:, None], x0).ravel()
+    y = np.where(CORNER_Y, y0 + np.asarray(w, dtype=float)[:, None], y0).ravel()
+    z = np.where(CORNER_Z, z0 + np.asarray(l, dtype=float)[:, None], z0).ravel()
+    offset = (np.arange(len(x0)) * 8)[:, None]
+    return {
+        "x": x,
+        "y": y,
+        "z": z,
+        "i": (offset + TRI_I).ravel(),
+        "j": (offset + TRI_J).ravel(),
+        "k": (offset + TRI_K).ravel(),
+    }
+
+
+def box_mesh_traces(d, colors=None, max_boxes=50000):
+    """Packed boxes of one truck as a handful of Mesh3d traces instead of one trace per box.
+
+    ``d`` is a DataFrame or ``results.TruckView`` with xx/yy/zz/h/w/l and
+    ``name`` columns; vertices are coloured by box type. Boxes are split into
+    chunks of ``max_boxes`` to keep each WebGL buffer a reasonable size.
+    """
+    names = np.asarray(d["name"]).astype(str)
+    types = box_type(names)
+    colors = colors or type_colors(types)
+    geometry = [np.asarray(d[col], dtype=float) for col in ("xx", "yy", "zz", "h", "w", "l")]
+    traces = []
+    for start in range(0, len(names), max_boxes):
+        chunk = slice(start, start + max_boxes)
+        mesh = box_vertices(*(col[chunk] for col in geometry))
+        traces.append(go.Mesh3d(
+            **mesh,
+            vertexcolor=np.repeat([colors[t] for t in types[chunk]], 8),
+            hovertext=np.repeat(names[chunk], 8),
+            hoverinfo="text",
+            flatshading=True,
+            showlegend=False,
+        ))
+    return traces
+
+
+def box_edges(xx, yy, zz, h, w, l, drop_shared=False, decimals=3):
+    """Wireframe of many boxes as x, y, z arrays for one Scatter3d, NaN between line runs.
+
+    By default this is the same outline the apps drew row by row, built in one
+    pass. With ``drop_shared`` every box gets all 12 edges and edges that
+    coincide exactly with an edge of another box (adjacent boxes) are left out.
+    """
+    mesh = box_vertices(xx, yy, zz, h, w, l)
+    corners = np.stack([mesh["x"], mesh["y"], mesh["z"]], axis=1).reshape(-1, 8, 3)
+    n = len(corners)
+
+    if not drop_shared:
+        out = np.full((n, len(OUTLINE_PATH), 3), np.nan)
+        keep = OUTLINE_PATH >= 0
+        out[:, keep] = corners[:, OUTLINE_PATH[keep]]
+        out = out.reshape(-1, 3)
+        return out[:, 0], out[:, 1], out[:, 2]
+
+    segments = np.concatenate([corners[:, EDGE_A], corners[:, EDGE_B]], axis=2).reshape(-1, 6)
+    _, inverse, counts = np.unique(np.round(segments, decimals), axis=0, return_inverse=True, return_counts=True)
+    segments = segments[counts[inverse.ravel()] == 1]
+
+    out = np.full((len(segments), 3, 3), np.nan)
+    out[:, 0] = segments[:, :3]
+    out[:, 1] = segments[:, 3:]
+    out = out.reshape(-1, 3)
+    return out[:, 0], out[:, 1], out[:, 2]
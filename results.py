@@ -0,0 +1,145 @@
+import json
+import re
+
+import numpy as np
+
+# One row per packed box. Trucks and box types are stored as small integer codes
+# into PackResult.truck_names / PackResult.type_names.
+RESULT_DTYPE = np.dtype([
+    ("truck", np.int16),
+    ("type", np.int32),
+    ("item", np.int32),  # k in the <Box_Type>_<k> item name, -1 if the name had no index
+    ("h", np.float64),
+    ("w", np.float64),
+    ("l", np.float64),
+    ("xx", np.float64),
+    ("yy", np.float64),
+    ("zz", np.float64),
+])
+GEOMETRY = ["h", "w", "l", "xx", "yy", "zz"]
+
+
+def _truck_order(name):
+    match = re.search(r"(\d+)$", name)
+    return (int(match.group(1)) if match else float("inf"), name)
+
+
+def _split_name(name):
+    box_type, _, k = str(name).rpartition("_")
+    if box_type and k.isdigit():
+        return box_type, int(k)
+    return str(name), -1
+
+
+class TruckView:
+    """Packed boxes of one truck. Column access returns views into the result's array."""
+
+    def __init__(self, result, rows):
+        self.result = result
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key == "name":
+                return self.result.item_names(self.rows)
+            if key == "type":
+                return self.result.type_names[self.rows["type"]]
+            if key == "bin_name":
+                return self.result.truck_names[self.rows["truck"]]
+            return self.rows[key]
+        # Slices stay views; boolean masks and index arrays copy just the selected rows
+        return TruckView(self.result, self.rows[key])
+
+    def to_frame(self):
+        import pandas as pd
+
+        frame = pd.DataFrame({col: self.rows[col] for col in GEOMETRY})
+        frame.insert(0, "name", self["name"])
+        frame.insert(0, "bin_name", self["bin_name"])
+        return frame
+
+
+class PackResult:
+    """Columnar packing result: a structured array grouped by truck plus a per-truck offset index.
+
+    ``rows[offsets[t]:offsets[t + 1]]`` are the boxes in truck ``t``, so selecting
+    a truck is a constant-time slice that shares memory with the result.
+    """
+
+    def __init__(self, rows, truck_names, type_names):
+        order = np.argsort(rows["truck"], kind="stable")
+        self.rows = rows[order]
+        self.truck_names = np.asarray(truck_names, dtype=object)
+        self.type_names = np.asarray(type_names, dtype=object)
+        self.truck_index = {name: t for t, name in enumerate(truck_names)}
+        counts = np.bincount(self.rows["truck"], minlength=len(truck_names))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    @classmethod
+    def from_records(cls, packed_data, truck_names=None):
+        """Build from the list-of-dicts form returned by ``pack_items``."""
+        bins = [r["bin_name"] for r in packed_data]
+        if truck_names is None:
+            truck_names = sorted(set(bins), key=_truck_order)
+        truck_index = {name: t for t, name in enumerate(truck_names)}
+
+        split = [_split_name(r.get("name", "")) for r in packed_data]
+        type_names, type_codes = np.unique(np.array([s[0] for s in split], dtype=object), return_inverse=True)
+
+        rows = np.empty(len(packed_data), dtype=RESULT_DTYPE)
+        rows["truck"] = [truck_index[b] for b in bins]
+        rows["type"] = type_codes.ravel()
+        rows["item"] = [s[1] for s in split]
+        for col in GEOMETRY:
+            rows[col] = [float(r[col]) for r in packed_data]
+        return cls(rows, truck_names, type_names)
+
+    def to_bytes(self):
+        """Plain-data form for disk caches: a JSON line with the names, then the raw rows."""
+        header = {"truck_names": self.truck_names.tolist(), "type_names": self.type_names.tolist(),
+                  "rows": len(self.rows)}
+        return json.dumps(header).encode() + b"\n" + self.rows.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        header, body = data.split(b"\n", 1)
+        header = json.loads(header)
+        rows = np.frombuffer(body, dtype=RESULT_DTYPE)
+        if len(rows) != header["rows"]:
+            raise ValueError(f"Expected {header['rows']} rows, got {len(rows)}")
+        return cls(rows, header["truck_names"], header["type_names"])
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes + self.offsets.nbytes
+
+    def truck(self, name):
+        """Boxes packed into truck ``name`` as a zero-copy view."""
+        t = self.truck_index[name]
+        return TruckView(self, self.rows[self.offsets[t]:self.offsets[t + 1]])
+
+    def trucks(self):
+        """(truck name, view) for every truck, including empty ones."""
+        return [(name, self.truck(name)) for name in self.truck_names]
+
+    def item_names(self, rows=None):
+        """<Box_Type>_<k> names, built only when asked for."""
+        rows = self.rows if rows is None else rows
+        types = self.type_names[rows["type"]]
+        return np.array([t if k < 0 else f"{t}_{k}" for t, k in zip(types, rows["item"])], dtype=object)
+
+    def to_records(self):
+        """Back to the list-of-dicts form, for code that still expects it."""
+        names = self.item_names()
+        bins = self.truck_names[self.rows["truck"]]
+        geometry = [self.rows[col].tolist() for col in GEOMETRY]
+        return [
+            {"bin_name": b, "name": n, **dict(zip(GEOMETRY, values))}
+            for b, n, values in zip(bins, names, zip(*geometry))
+        ]
@@ -0,0 +1,128 @@
+import functools
+import math
+
+import numpy as np
+
+from results import PackResult
+
+# Kingpin and rear axle group of a typical semi-trailer, as fractions of the load length from the front (x = 0)
+AXLES = (0.05, 0.8)
+EPS = 1e-9
+
+
+@functools.lru_cache(maxsize=4096)
+def _span(lo, hi, cell, n):
+    """First and past-the-end grid cells covering [lo, hi), and how much of each the interval covers.
+
+    Cached: boxes in a load share a few edge positions, and callers only read the weights.
+    """
+    i0 = min(max(int(lo // cell), 0), n)
+    i1 = min(max(math.ceil(hi / cell - EPS), i0), n)
+    if i1 - i0 == 1:
+        return i0, i1, np.array([hi - lo])
+    edges = np.arange(i0, i1 + 1) * cell
+    return i0, i1, np.minimum(edges[1:], hi) - np.maximum(edges[:-1], lo)
+
+
+class TruckLoad:
+    """Heightmap over one truck floor plus running weight, centre of gravity and axle loads.
+
+    The floor is a grid of ``cell`` x ``cell`` squares holding the height of
+    the load's top surface, raised as each box is added, so checking or adding
+    a box only touches the cells under its footprint. Boxes must be added
+    bottom up (any order a packer places them in works) for support to be
+    exact: the map keeps one height per cell, so a box slid in under an
+    overhang is only credited with the support visible from above, and a
+    box edge is rounded out to whole cells. Weights are ``Box_Capcity``.
+    """
+
+    def __init__(self, dims, cell=1.0, axles=AXLES):
+        self.dims = [float(dim) for dim in dims]
+        self.cell = float(cell)
+        self.heights = np.zeros((max(int(np.ceil(self.dims[0] / cell)), 1), max(int(np.ceil(self.dims[1] / cell)), 1)))
+        self.axles = (axles[0] * self.dims[0], axles[1] * self.dims[0])
+        self.weight = 0.0
+        self.moment = [0.0, 0.0, 0.0]  # sum of weight * box centre
+
+    def _footprint(self, x, y, a, b):
+        i0, i1, wx = _span(x, x + a, self.cell, self.heights.shape[0])
+        j0, j1, wy = _span(y, y + b, self.cell, self.heights.shape[1])
+        return self.heights[i0:i1, j0:j1], wx, wy
+
+    def support(self, x, y, z, a, b, tol=1e-6):
+        """Share of the footprint of a box with its bottom at ``z`` that rests on the floor or box tops."""
+        if z <= tol:
+            return 1.0
+        return self._resting(*self._footprint(x, y, a, b), z, a * b, tol)
+
+    @staticmethod
+    def _resting(heights, wx, wy, z, area, tol=1e-6):
+        return float(wx @ (np.abs(heights - z) <= tol) @ wy) / area if area > 0 else 0.0
+
+    def add(self, x, y, z, a, b, c, weight=0.0, tol=1e-6):
+        """Record a placed box; returns its support share as it was placed."""
+        heights, wx, wy = self._footprint(x, y, a, b)
+        share = 1.0 if z <= tol else self._resting(heights, wx, wy, z, a * b, tol)
+        np.maximum(heights, z + c, out=heights)
+        self.weight += weight
+        self.moment[0] += weight * (x + a / 2)
+        self.moment[1] += weight * (y + b / 2)
+        self.moment[2] += weight * (z + c / 2)
+        return share
+
+    @property
+    def centre_of_gravity(self):
+        """(x, y, z) of the load, or None while it weighs nothing."""
+        return tuple(m / self.weight for m in self.moment) if self.weight > 0 else None
+
+    def axle_loads(self):
+        """(front, rear) reactions of the load on two axles, from moments about each; negative means lifting."""
+        front, rear = self.axles
+        if self.weight <= 0 or rear <= front:
+            return 0.0, 0.0
+        on_rear = self.weight * (self.moment[0] / self.weight - front) / (rear - front)
+        return self.weight - on_rear, on_rear
+
+    def metrics(self):
+        """Weight, centre of gravity, its offset from the floor centre (fractions of length and width) and axle loads."""
+        cog = self.centre_of_gravity
+        length, width, _ = self.dims
+        return {
+            "weight": self.weight,
+            "cog": cog,
+            "offset": None if cog is None else ((cog[0] - length / 2) / length, (cog[1] - width / 2) / width),
+            "axle_loads": self.axle_loads(),
+        }
+
+
+def load_metrics(result, containers, pbins, cell=1.0, min_support=0.5, axles=AXLES, trucks=None):
+    """``TruckLoad.metrics`` for every loaded truck of a packing, plus its support.
+
+    ``result`` is a PackResult or the records from ``pack_items``. Each truck's
+    boxes are replayed bottom up through one TruckLoad, so support is found
+    from the heightmap rather than by comparing boxes. Returns {truck name:
+    metrics}, with ``floating`` (boxes resting on less than ``min_support`` of
+    their footprint) and the lowest ``support`` share of any box. ``trucks``
+    limits it to those truck names.
+    """
+    from packing import truck_names  # packing imports ep_packer, which uses TruckLoad
+
+    if not isinstance(result, PackResult):
+        result = PackResult.from_records(result, truck_names(containers))
+    dims = dict(zip(truck_names(containers), containers))
+    type_weight = {str(name): float(cfg["s"][3]) for name, cfg in pbins.items()}
+    weights = np.array([type_weight.get(str(name), 0.0) for name in result.type_names])
+
+    report = {}
+    for name, view in result.trucks():
+        rows = view.rows
+        if not len(rows) or (trucks is not None and name not in trucks):
+            continue
+        rows = rows[np.argsort(rows["zz"], kind="stable")]
+        load = TruckLoad(dims[name], cell, axles)
+        shares = [load.add(*box, weight=w) for box, w in zip(
+            np.stack([rows[col] for col in ("xx", "yy", "zz", "h", "w", "l")], axis=1).astype(float).tolist(),
+            weights[rows["type"]].tolist())]
+        report[name] = {**load.metrics(), "floating": sum(share < min_support for share in shares),
+                        "support": min(shares)}
+    return report
@@ -1,36 +1,40 @@
+import uuid
 import streamlit as st
 import pandas as pd
-from py3dbp import Packer, Bin, Item
 import plotly.graph_objects as go
+from ingest import UPLOAD_TYPES, load_boxes, load_trucks
+from pack_cache import cache_key, containers_digest, file_digest, pbins_digest, result_cache
+from jobs import PackingStopped, job_manager
+from packing import ENGINES, build_containers, build_pbins, pack_items, truck_names
+from portfolio import OBJECTIVES, run_portfolio
+from fleet import fleet_bounds, pack_presolved
+from render import box_edges, box_mesh_traces, type_colors
+from results import PackResult
+from lod import lod_mesh_traces
+from threejs_view import scene_html, truck_scene
+from profiler import StageProfiler
+from verify import describe, verify_packing
+from patterns import library_stats, pattern_library
+from pack_client import SERVICE_URL, pack_remote
+from improve import improve_packing
+from incremental import attach_box_ids, manifest_diff, name_by_box_id, repack_incremental
+from stability import load_metrics
  
 # Assuming 'DATA_1000 1.xlsx' and 'trucks2_1.xlsx' are in the same directory as the script or uploaded by the user
  
+# Opt-in timing of each stage, shown in the sidebar at the end of the run
+profiler = StageProfiler(enabled=st.sidebar.checkbox("Profile stages"))
+ 
 # Upload boxes data
-uploaded_boxes_file = st.file_uploader("Choose a file for boxes data", type=['xlsx'])
-if uploaded_boxes_file is not None:
-    boxes_df = pd.read_excel(uploaded_boxes_file)
-else:
+uploaded_boxes_file = st.file_uploader("Choose a file for boxes data", type=UPLOAD_TYPES)
+if uploaded_boxes_file is None:
     st.stop()
  
 # Upload trucks data
-uploaded_trucks_file = st.file_uploader("Choose a file for trucks data", type=['xlsx'])
-if uploaded_trucks_file is not None:
-    container_df = pd.read_excel(uploaded_trucks_file)
-else:
+uploaded_trucks_file = st.file_uploader("Choose a file for trucks data", type=UPLOAD_TYPES)
+if uploaded_trucks_file is None:
     st.stop()
  
-selected_df = boxes_df[['Box_ID', 'Box_Type', 'Box_Length', 'Box_Width', 'Box_Height', 'Box_Capcity']].copy()
-selected_df.columns = ['Item_Id', 'name', 'length', 'width', 'height', 'weight']
- 
-# Process bins
-pbins = {
-    name: {
-        'n': group['name'].count(),
-        's': [group['length'].iloc[0], group['width'].iloc[0], group['height'].iloc[0], group['weight'].iloc[0]]
-    }
-    for name, group in selected_df.groupby('name')
-}
- 
 def vertices(xmin=0, ymin=0, zmin=0, xmax=1, ymax=1, zmax=1):
     return {
         "x": [xmin, xmin, xmax, xmax, xmin, xmin, xmax, xmax],
@@ -41,109 +45,350 @@ def vertices(xmin=0, ymin=0, zmin=0, xmax=1, ymax=1, zmax=1):
         "k": [0, 7, 2, 3, 6, 7, 1, 6, 5, 5, 7, 2],
     }
  
-containers = container_df[['Truck_Length(Inch)', 'Truck_Width(Inch)', 'Truck_Height(Inch)']].values.tolist()
-available_trucks = ["Truck-" + str(i + 1) for i in range(len(containers))]
+pack_params = {
+    # "blocks" packs whole Box_Type blocks at once; "extreme-points" places boxes one by one
+    # but only checks nearby boxes. Both are much faster than py3dbp on large manifests.
+    # "portfolio" runs several engines/orderings in parallel and keeps the best.
+    "engine": st.sidebar.selectbox("Packing engine", ENGINES + ["portfolio"]),
+    "bigger_first": True,
+    "distribute_items": True,
+    "number_of_decimals": 3,
+    "max_weight": 18000.0,
+    # Pack a pre-sized subset of the fleet first and only add trucks while boxes are left over
+    "presolve": st.sidebar.checkbox("Size the fleet before packing", value=True),
+    # Used by extreme-points and the improvement search; stabler loads, but fewer boxes packed
+    "min_support": st.sidebar.slider(
+        "Minimum support under each box", min_value=0.0, max_value=1.0, value=0.5, step=0.05,
+        help="Share of a box's footprint that must rest on the floor or on other boxes (extreme-points engine "
+             "and plan improvement). Higher is more stable but packs fewer boxes: at 0.5, 3000-box, "
+             "12-type loads packed 1-6% fewer boxes than at 0."),
+    # Extra seconds of ruin-and-recreate search after the greedy pass, for a fuller load
+    "improve": st.sidebar.number_input("Improve the plan for (seconds, 0 = off)", min_value=0.0, value=0.0),
+}
+# A re-uploaded box file that adds or drops a few Box_IDs keeps the last plan and only places the changes
+repack_changes = st.sidebar.checkbox(
+    "Repack only the changes when the box file is re-uploaded", value=True,
+    help="Boxes still in the file keep their place; new boxes go into the free space, and at most a few trucks "
+         "are repacked. Uncheck for a full packing of the new file.")
+if pack_params["engine"] == "portfolio":
+    portfolio_params = {
+        "objective": st.sidebar.selectbox("Keep the result with", OBJECTIVES,
+                                          format_func={"utilization": "best utilization",
+                                                       "unpacked": "fewest unpacked boxes",
+                                                       "first": "first to finish"}.get),
+        "budget": st.sidebar.number_input("Time budget (seconds, 0 = none)", min_value=0.0, value=60.0) or None,
+    }
  
-# Streamlit selection box for trucks
-selected_truck = st.selectbox('Select Truck:', available_trucks)
  
-# Function to pack items
-def pack_items(containers, pbins):
-    packer = Packer()
-    for i, container in enumerate(containers):
-        container_dims = [float(dim) for dim in container]
-        packer.add_bin(Bin("Truck-" + str(i + 1), *container_dims, 18000.0))
- 
-    for name, cfg in pbins.items():
-        for i in range(cfg["n"]):
-            item_dims = [float(dim) for dim in cfg["s"]]
-            packer.add_item(Item(f"{name}_{i}", *item_dims))
- 
-    packer.pack(bigger_first=True, distribute_items=True, number_of_decimals=3)
- 
-    packed_data = []  # Store the packing results in a local variable
-    for i, bin in enumerate(packer.bins):
-        for item in bin.items:
-            packed_data.append({
-                "bin_name": bin.name,
-                "bin_index": i,  # Use loop variable i instead of non-existent bin.index
-                **{d: v for v, d in zip(item.get_dimension(), list("hwl"))},
-                **{d + d: v for v, d in zip(item.position, list("xyz"))}
-            })
-    return packed_data
- 
-packed_data = pack_items(containers, pbins)  # Use the returned packed_data for plotting
+def read_manifests():
+    with profiler.stage("read manifests") as counts:
+        boxes_df = load_boxes(uploaded_boxes_file)
+        container_df = load_trucks(uploaded_trucks_file)
+        counts.update(boxes=len(boxes_df), trucks=len(container_df))
+ 
+    with profiler.stage("group pbins") as counts:
+        pbins = build_pbins(boxes_df)
+        counts["box_types"] = len(pbins)
+    return build_containers(container_df), pbins, (boxes_df, container_df)
+ 
+# Packing and result building; runs in a background thread that reports each finished truck
+def pack_job(containers, pbins, manifests):
+    params = dict(pack_params)
+    improve = params.pop("improve")
+    def pack(progress, stop, profile):
+        report = None
+        with profile.stage("pack", engine=params["engine"]) as counts:
+            if SERVICE_URL and params["engine"] != "portfolio":
+                # Shared packing service: no per-truck progress; cancelling abandons the request, which the
+                # service still finishes
+                packed_data = pack_remote(SERVICE_URL, *manifests, stop=stop, **params)
+            elif params.pop("presolve") and params["engine"] != "portfolio":
+                packed_data, _ = pack_presolved(containers, pbins, progress=progress, stop=stop, **params)
+            elif params["engine"] == "portfolio":
+                packed_data, report = run_portfolio(containers, pbins, max_weight=params["max_weight"], stop=stop,
+                                                    **portfolio_params)
+            else:
+                packed_data = pack_items(containers, pbins, progress=progress, stop=stop, **params)
+            counts["packed"] = len(packed_data)
+        improved = None
+        if improve:
+            with profile.stage("improve", budget=improve):
+                # Cancelling here still gives the best plan found so far; the job ends "stopped" and isn't cached
+                packed_data, improved = improve_packing(containers, pbins, packed_data, budget=improve, stop=stop,
+                                                        max_weight=params["max_weight"],
+                                                        min_support=params["min_support"])
+        # Keep the compact columnar form; the list of dicts is dropped here
+        with profile.stage("build result"):
+            result = PackResult.from_records(packed_data, truck_names(containers))
+        if improved is not None and improved["interrupted"]:
+            raise PackingStopped((containers, result, report))
+        return containers, result, report
+    return pack
  
 # Plot function
-def plot_for_truck(selected_truck, containers, packed_data):
-    df = pd.DataFrame(packed_data)
-    # Filter by selected truck
-    df = df[df['bin_name'].str.contains(selected_truck)]
-    # Create a figure for each container (bin)
-    for pbin, d in df.groupby("bin_name"):
-        fig = go.Figure()
-        # Add wireframe for the full truck dimensions (completely transparent)
-        truck_dimensions = [float(dim) for dim in containers[int(pbin.split("-")[1]) - 1]]
-        truck_outline = vertices(0, 0, 0, *truck_dimensions)
-        fig.add_trace(
-            go.Mesh3d(
-                x=truck_outline["x"],
-                y=truck_outline["y"],
-                z=truck_outline["z"],
-                i=truck_outline["i"],
-                j=truck_outline["j"],
-                k=truck_outline["k"],
-                opacity=0,  # Completely transparent
-                color='blue',
-                hoverinfo='skip'
-            )
-        )
-        # Plot packed items and grid lines
-        xx = []
-        yy = []
-        zz = []
-        for _, r in d.iterrows():
-            fig.add_trace(
-                go.Mesh3d(r[["x", "y", "z", "i", "j", "k", "name", "color"]].to_dict())
-            )
-            xx += [r.xx, r.xx + r.h, r.xx + r.h, r.xx, r.xx, None] * 2 + [r.xx] * 5 + [None]
-            yy += [r.yy, r.yy, r.yy + r.w, r.yy + r.w, r.yy, None] * 2 + [
-                r.yy,
-                r.yy + r.w,
-                r.yy + r.w,
-                r.yy,
-                r.yy,
-                None,
-            ]
-            zz += [r.zz] * 5 + [None] + [r.zz + r.l] * 5 + [None] + [r.zz, r.zz, r.zz + r.l, r.zz + r.l, r.zz, None]
-        fig.add_trace(
-            go.Scatter3d(
-                x=xx,
-                y=yy,
-                z=zz,
-                mode="lines",
-                line_color="black",
-                line_width=2,
-                hoverinfo="skip",
-            )
+def plot_for_truck(selected_truck, containers, result):
+    # Colours are assigned over the whole load so a box type looks the same in every truck
+    colors = type_colors(result.type_names)
+    # Boxes of the selected truck, a slice of the columnar result
+    d = result.truck(selected_truck)
+    if len(d) == 0:
+        st.write("No boxes packed in the selected truck.")
+        return
+    if viewer == "three.js (instanced)":
+        # One cube geometry plus per-box buffers; the HTML carries about 36 bytes a box.
+        # The page is static, so it can't run the Python box picking; it keeps the camera controls.
+        # Picking is notebook-only: truck_scene with picking=True in Jupyter or Voila
+        truck_dimensions = [float(dim) for dim in containers[int(selected_truck.split("-")[1]) - 1]]
+        with profiler.stage("build figure", boxes=len(d)):
+            html = scene_html(truck_scene(d, truck_dimensions, colors, picking=False), title=selected_truck)
+        with profiler.stage("threejs html", bytes=len(html)):
+            st.iframe(html, height=540)
+        st.caption("Double-click box picking isn't available here; open the truck with threejs_view.truck_scene "
+                   "in a notebook to see Box_IDs.")
+        return
+    with profiler.stage("build figure", boxes=len(d)) as counts:
+        fig = build_truck_figure(selected_truck, containers, d, colors)
+        counts["traces"] = len(fig.data)
+    # Display the figure in Streamlit
+    with profiler.stage("plotly_chart"):
+        st.plotly_chart(fig)
+ 
+def build_truck_figure(selected_truck, containers, d, colors):
+    fig = go.Figure()
+    # Add wireframe for the full truck dimensions (completely transparent)
+    truck_dimensions = [float(dim) for dim in containers[int(selected_truck.split("-")[1]) - 1]]
+    truck_outline = vertices(0, 0, 0, *truck_dimensions)
+    fig.add_trace(
+        go.Mesh3d(
+            x=truck_outline["x"],
+            y=truck_outline["y"],
+            z=truck_outline["z"],
+            i=truck_outline["i"],
+            j=truck_outline["j"],
+            k=truck_outline["k"],
+            opacity=0,  # Completely transparent
+            color='blue',
+            hoverinfo='skip'
         )
-        # Configure the figure
-        ar = 4
-        xr = max(d["x"].max()) - min(d["x"].min())
-        aspect_ratio_x = ar
-        aspect_ratio_y = ((max(d["y"].max()) - min(d["y"].min())) / xr) * ar
-        aspect_ratio_z = ((max(d["z"].max()) - min(d["z"].min())) / xr) * ar
-        fig.update_layout(
-            title={"text": pbin, "y": 0.9, "x": 0.5, "xanchor": "center", "yanchor": "top"},
-            margin={"l": 0, "r": 0, "t": 0, "b": 0},
-            scene=dict(
-                camera=dict(eye=dict(x=2, y=2, z=2)),
-                aspectratio=dict(x=aspect_ratio_x, y=aspect_ratio_y, z=aspect_ratio_z),
-                aspectmode="manual",
-            ),
+    )
+    # Plot packed items as one batched mesh, then grid lines
+    if show_all_boxes:
+        fig.add_traces(box_mesh_traces(d, colors))
+    else:
+        # Drop boxes hidden behind their neighbours and merge flat runs of same-type faces
+        traces, hidden, lod_stats = lod_mesh_traces(d, truck_dimensions, colors)
+        fig.add_traces(traces)
+        d = d[~hidden]
+        st.caption(f"{lod_stats['hidden_boxes']} of {lod_stats['boxes']} boxes hidden, "
+                   f"{lod_stats['triangles']} triangles instead of {lod_stats['triangles_full']}")
+    xx, yy, zz = box_edges(d["xx"], d["yy"], d["zz"], d["h"], d["w"], d["l"], drop_shared=hide_shared_edges)
+    fig.add_trace(
+        go.Scatter3d(
+            x=xx,
+            y=yy,
+            z=zz,
+            mode="lines",
+            line_color="black",
+            line_width=2,
+            hoverinfo="skip",
         )
-        # Display the figure in Streamlit
-        st.plotly_chart(fig)
+    )
+    # Configure the figure
+    ar = 4
+    xr = truck_dimensions[0]
+    aspect_ratio_x = ar
+    aspect_ratio_y = (truck_dimensions[1] / xr) * ar
+    aspect_ratio_z = (truck_dimensions[2] / xr) * ar
+    fig.update_layout(
+        title={"text": selected_truck, "y": 0.9, "x": 0.5, "xanchor": "center", "yanchor": "top"},
+        margin={"l": 0, "r": 0, "t": 0, "b": 0},
+        scene=dict(
+            camera=dict(eye=dict(x=2, y=2, z=2)),
+            aspectratio=dict(x=aspect_ratio_x, y=aspect_ratio_y, z=aspect_ratio_z),
+            aspectmode="manual",
+        ),
+    )
+    return fig
+ 
+viewer = st.sidebar.selectbox("3D viewer", ["Plotly", "three.js (instanced)"])
+hide_shared_edges = st.sidebar.checkbox("Hide edges shared by adjacent boxes")
+show_all_boxes = st.sidebar.checkbox("Show all boxes (including ones hidden inside the load)")
+ 
+# This session's last plan, moved onto the new box file: removed boxes are taken out and added ones placed
+# around the rest. None when the files can't be matched up that way, and a full packing is needed instead
+def repack_from(previous, containers, pbins, boxes_df):
+    changed_types = {name for name, cfg in pbins.items()
+                     if name in previous["pbins"] and cfg["s"] != previous["pbins"][name]["s"]}
+    if changed_types or not boxes_df["Box_ID"].is_unique or not previous["boxes_df"]["Box_ID"].is_unique:
+        return None
+    added, removed = manifest_diff(previous["boxes_df"], boxes_df)
+    if len(added) + len(removed) > len(boxes_df) // 2:
+        return None
+    _, old_result, _ = previous["packed"]
+    packed_data, changes = repack_incremental(
+        containers, attach_box_ids(old_result.to_records(), previous["boxes_df"]), previous["boxes_df"],
+        added, removed, max_weight=pack_params["max_weight"], number_of_decimals=pack_params["number_of_decimals"],
+        min_support=pack_params["min_support"])
+    result = PackResult.from_records(name_by_box_id(packed_data, boxes_df), truck_names(containers))
+    return (containers, result, None), changes
+
+# Progress of a running job; only this part reruns while it packs, and finished trucks can be previewed
+@st.fragment(run_every=1.0)
+def packing_progress(job, containers):
+    if job.status not in ("queued", "running"):
+        # The full rerun picks the result up from the cache; hand it the job's stage timings
+        st.session_state.pack_profile = job.profile
+        st.rerun()
+    if job.cancelled:
+        st.info("Cancelling...")
+        return
+    st.progress(job.fraction(), text=f"Packing with {pack_params['engine']}: {job.trucks_done} of "
+                                     f"{job.total_trucks} trucks, {job.boxes_placed} of {job.total_boxes} boxes placed")
+    if st.button("Cancel packing"):
+        st.session_state.cancelled_job = job
+        job_manager.cancel(job.key)
+        st.rerun()
+    finished, records = job.snapshot()
+    if finished:
+        preview_truck = st.selectbox("Finished trucks:", finished)
+        if st.toggle("Preview finished truck"):
+            plot_for_truck(preview_truck, containers, PackResult.from_records(records, truck_names(containers)))
+ 
+# Every widget change reruns the script; the manifests are only read again when an upload changes
+upload_digests = (file_digest(uploaded_boxes_file), file_digest(uploaded_trucks_file))
+if st.session_state.get("upload_digests") != upload_digests:
+    containers, pbins, manifests = read_manifests()
+    st.session_state.manifests = containers, pbins, manifests, pbins_digest(pbins), containers_digest(containers)
+    st.session_state.upload_digests = upload_digests
+containers, pbins, manifests, boxes_digest, trucks_digest = st.session_state.manifests
+# Keyed on the grouped boxes and truck sizes rather than the file bytes, so the same load
+# uploaded as csv or xlsx, or with its rows in another order, is only packed once
+pack_key = cache_key(
+    boxes_digest, trucks_digest,
+    **pack_params, **(portfolio_params if pack_params["engine"] == "portfolio" else {}),
+)
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+with profiler.stage("result cache") as counts:
+    # Results are shared with other sessions and worker processes, and kept across restarts
+    packed = result_cache.get(pack_key)
+    counts["cache_hit"] = packed is not None
+# The same trucks and settings; a new box file with this key can start from the session's last plan
+fleet_key = cache_key(
+    "", trucks_digest, **pack_params, **(portfolio_params if pack_params["engine"] == "portfolio" else {}),
+)
+previous = st.session_state.get("last_plan")
+changes = None
+if packed is None and repack_changes and previous is not None:
+    if previous["key"] == pack_key and previous["changes"] is not None:
+        # An incremental plan isn't what a full packing of this file gives, so it stays in the session
+        packed, changes = previous["packed"], previous["changes"]
+    elif previous["fleet_key"] == fleet_key:
+        with profiler.stage("incremental repack") as counts:
+            repacked = repack_from(previous, containers, pbins, manifests[0])
+            counts["incremental"] = repacked is not None
+        if repacked is not None:
+            packed, changes = repacked
+cancelled = st.session_state.get("cancelled_job")
+if packed is None and cancelled is not None and cancelled.key == pack_key:
+    if cancelled.wait(timeout=1.0) and cancelled.status == "stopped":
+        # Cancelled while improving: the plan is valid, just not improved for the full budget
+        packed = cancelled.result()
+        st.info("Improving was stopped early; this is the best plan found by then, and it isn't cached.")
+    else:
+        st.info("Packing was cancelled.")
+    if st.button("Start packing again"):
+        del st.session_state.cancelled_job
+        st.rerun()
+    elif packed is None:
+        st.stop()
+if packed is None:
+    # The packing itself runs in the job's thread; its stages are merged in below this one
+    with profiler.stage("pack job"):
+        job = job_manager.watch(st.session_state.session_id, pack_key, pack_job(containers, pbins, manifests),
+                                len(containers), sum(int(cfg["n"]) for cfg in pbins.values()))
+        # Most manifests finish within a second; only longer runs show the progress view
+        if job is None or job.wait(timeout=1.0):
+            packed = result_cache.get(pack_key) if job is None or job.status != "done" else job.result()
+            if job is not None:
+                profiler.merge(job.profile, depth=1)
+    if packed is None:
+        if job is not None and job.status == "failed":
+            st.exception(job.error)
+        else:
+            packing_progress(job, containers)
+        profiler.render(st)
+        st.stop()
+else:
+    # A result from the cache; any job this session was waiting on is now obsolete
+    job_manager.release(st.session_state.session_id)
+    if "pack_profile" in st.session_state:
+        profiler.merge(st.session_state.pop("pack_profile"))
+st.session_state.last_plan = {"key": pack_key, "fleet_key": fleet_key, "pbins": pbins, "boxes_df": manifests[0],
+                               "packed": packed, "changes": changes}
+containers, pack_result, pack_report = packed  # Use the returned pack_result for plotting
+if changes is not None:
+    repacked_trucks = f"; repacked {', '.join(changes['repacked_trucks'])}" if changes["repacked_trucks"] else ""
+    st.info(f"Repacked only the changes to the box file: {changes['removed']} boxes taken out, "
+            f"{changes['added']} added and {changes['resettled']} that rested on removed ones placed again "
+            f"({changes['placed_in_free_space']} in free space{repacked_trucks}), "
+            f"{len(changes['unpacked'])} left unpacked. "
+            f"Trucks changed: {', '.join(changes['touched_trucks']) or 'none'}.")
+if pack_report:
+    with st.sidebar.expander("Portfolio strategies"):
+        st.dataframe(pd.DataFrame(pack_report))
+ 
+# How many trucks the load needs at least, next to how many the plan uses
+fleet = fleet_bounds(containers, pbins, pack_params["max_weight"])
+trucks_used = sum(1 for _, view in pack_result.trucks() if len(view))
+if fleet["insufficient"]:
+    shortages = []
+    if fleet["volume_bound"] is None:
+        shortages.append(f"the boxes take {fleet['box_volume']:,.0f} of volume and the trucks hold "
+                         f"{fleet['fleet_volume']:,.0f}")
+    if fleet["weight_bound"] > fleet["trucks"]:
+        shortages.append(f"the boxes weigh enough for {fleet['weight_bound']} trucks")
+    if fleet["short_types"]:
+        shortages.append(f"too many boxes for the trucks they fit in: {', '.join(map(str, fleet['short_types']))}")
+    st.warning(f"The trucks can't carry the whole load ({'; '.join(shortages)}); "
+               f"this plan uses {trucks_used}.")
+else:
+    st.caption(f"At least {fleet['lower_bound']} of {fleet['trucks']} trucks are needed "
+               f"(volume {fleet['volume_bound']}, weight {fleet['weight_bound']}, box fit {fleet['fit_bound']}); "
+               f"this plan uses {trucks_used}.")
+if fleet["unfit_types"]:
+    st.warning(f"{fleet['unfit_boxes']} boxes fit in no truck: {', '.join(map(str, fleet['unfit_types']))}")
+ 
+# Check the plan before it is shown: overlaps, truck bounds, truck weight and support under each box
+with profiler.stage("verify plan", boxes=len(pack_result)):
+    verification = verify_packing(pack_result, containers, pbins, pack_params["max_weight"])
+for problem in describe(verification):
+    st.warning(problem)
+ 
+available_trucks = truck_names(containers)
+ 
+# Streamlit selection box for trucks
+selected_truck = st.selectbox('Select Truck:', available_trucks)
+
+# Load balance of the selected truck, from its boxes' Box_Capcity weights
+with profiler.stage("load balance", boxes=len(pack_result.truck(selected_truck))):
+    balance = load_metrics(pack_result, containers, pbins, trucks={selected_truck}).get(selected_truck)
+if balance is not None and balance["cog"] is None:
+    st.caption("The boxes in this truck weigh nothing, so it has no centre of gravity or axle loads.")
+elif balance is not None:
+    (cx, cy, cz), (dx, dy), (front, rear) = balance["cog"], balance["offset"], balance["axle_loads"]
+    st.caption(f"Weight {balance['weight']:,.0f}; centre of gravity at x {cx:.1f}, y {cy:.1f}, z {cz:.1f} "
+               f"({dx:+.1%} of the length and {dy:+.1%} of the width off centre); "
+               f"axle loads front {front:,.0f}, rear {rear:,.0f}")
+    if min(front, rear) < 0:
+        st.warning(f"The centre of gravity of {selected_truck} is outside its axles.")
  
 if st.button('Show Packing for Selected Truck'):
-    plot_for_truck(selected_truck, containers, packed_data)
+    plot_for_truck(selected_truck, containers, pack_result)
+ 
+patterns = library_stats(pattern_library())
+if patterns["hits"] or patterns["misses"]:
+    st.sidebar.caption(f"Loading patterns: {patterns['hits']} reused, {patterns['misses']} computed, "
+                       f"{patterns['stored']} stored")
+ 
+profiler.render(st)
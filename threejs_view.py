@@ -0,0 +1,159 @@
+import io
+
+import numpy as np
+from plotly.colors import convert_colors_to_same_type
+
+from render import box_type, type_colors
+
+# Each instance is the unit cube scaled to the box extents and moved to its corner.
+# Shading is a fixed directional light so no lights need to be set up in the scene.
+VERTEX_SHADER = """
+attribute vec3 instanceOffset;
+attribute vec3 instanceScale;
+attribute vec3 instanceColor;
+varying vec3 vColor;
+varying vec3 vNormal;
+void main() {
+    vColor = instanceColor;
+    vNormal = normal;
+    vec3 p = position * instanceScale + instanceOffset;
+    gl_Position = projectionMatrix * modelViewMatrix * vec4(p, 1.0);
+}
+"""
+FRAGMENT_SHADER = """
+varying vec3 vColor;
+varying vec3 vNormal;
+void main() {
+    float light = 0.55 + 0.45 * abs(dot(normalize(vNormal), normalize(vec3(0.4, -0.6, 0.7))));
+    gl_FragColor = vec4(vColor * light, 1.0);
+}
+"""
+
+
+def unit_cube():
+    """Positions, normals and triangle indices of a unit cube with a corner at the origin.
+
+    Each face has its own four vertices so the normals stay flat.
+    """
+    positions, normals, index = [], [], []
+    for axis in range(3):
+        u, v = [a for a in range(3) if a != axis]
+        for side in (0.0, 1.0):
+            base = len(positions)
+            for cu, cv in ((0, 0), (1, 0), (1, 1), (0, 1)):
+                p = [0.0, 0.0, 0.0]
+                p[axis], p[u], p[v] = side, cu, cv
+                positions.append(p)
+                n = [0.0, 0.0, 0.0]
+                n[axis] = 1.0 if side else -1.0
+                normals.append(n)
+            # Wind both triangles so they face outwards
+            quad = [0, 1, 2, 0, 2, 3] if (side == 1.0) == (axis != 1) else [0, 2, 1, 0, 3, 2]
+            index.extend(base + q for q in quad)
+    return (np.array(positions, dtype=np.float32), np.array(normals, dtype=np.float32),
+            np.array(index, dtype=np.uint16))
+
+
+def instance_buffers(d, colors=None):
+    """Per-box corner, extents and RGB colour as float32 (n, 3) arrays; about 36 bytes a box."""
+    offset = np.stack([d["xx"], d["yy"], d["zz"]], axis=1).astype(np.float32)
+    scale = np.stack([d["h"], d["w"], d["l"]], axis=1).astype(np.float32)
+    types = box_type(d["name"])
+    colors = colors or type_colors(types)
+    names = sorted(set(types))
+    rgb = np.array(convert_colors_to_same_type([colors[name] for name in names], colortype="tuple")[0],
+                   dtype=np.float32).reshape(-1, 3)
+    codes = np.searchsorted(np.array(names, dtype=object), types)
+    return offset, scale, rgb[codes]
+
+
+def ray_pick(origin, target, lo, hi):
+    """Index of the first box hit by the ray from ``origin`` through ``target``, or -1.
+
+    A slab test over every box at once; ``lo`` and ``hi`` are (n, 3) corners.
+    """
+    origin = np.asarray(origin, dtype=float)
+    direction = np.asarray(target, dtype=float) - origin
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv = 1.0 / direction
+        t0 = (lo - origin) * inv
+        t1 = (hi - origin) * inv
+    t_near = np.nanmax(np.minimum(t0, t1), axis=1)
+    t_far = np.nanmin(np.maximum(t0, t1), axis=1)
+    hit = (t_near <= t_far) & (t_far >= 0)
+    if not hit.any():
+        return -1
+    return int(np.flatnonzero(hit)[np.argmin(t_near[hit])])
+
+
+def truck_scene(d, truck_dims, colors=None, labels=None, width=800, height=500, picking=True):
+    """pythreejs viewer for one truck: one cube geometry drawn once per box on the GPU.
+
+    ``d`` is a TruckView or DataFrame of packed boxes. With ``picking``,
+    double-clicking the load shows the label of the box under the cursor:
+    ``labels`` if given (e.g. the Box_IDs from ``incremental.attach_box_ids``),
+    otherwise the item names. Picking runs in Python, so it needs a live kernel
+    (Jupyter, Voila); for the static HTML from ``scene_html`` pass
+    ``picking=False`` to get just the renderer with its camera controls.
+    """
+    import ipywidgets
+    import pythreejs as three
+
+    L, W, H = (float(dim) for dim in truck_dims)
+    positions, normals, index = unit_cube()
+    offset, scale, rgb = instance_buffers(d, colors)
+    geometry = three.InstancedBufferGeometry(
+        attributes={
+            "position": three.BufferAttribute(positions, normalized=False),
+            "normal": three.BufferAttribute(normals, normalized=False),
+            "index": three.BufferAttribute(index, normalized=False),
+            "instanceOffset": three.InstancedBufferAttribute(offset, meshPerAttribute=1),
+            "instanceScale": three.InstancedBufferAttribute(scale, meshPerAttribute=1),
+            "instanceColor": three.InstancedBufferAttribute(rgb, meshPerAttribute=1),
+        },
+        maxInstancedCount=len(offset),
+    )
+    boxes = three.Mesh(geometry, three.ShaderMaterial(vertexShader=VERTEX_SHADER, fragmentShader=FRAGMENT_SHADER))
+    outline = three.LineSegments(three.EdgesGeometry(three.BoxBufferGeometry(L, W, H)),
+                                 three.LineBasicMaterial(color="#444444"), position=(L / 2, W / 2, H / 2))
+
+    camera = three.PerspectiveCamera(position=(L * 1.1, -W * 2.5, H * 3), up=(0, 0, 1), fov=45,
+                                     aspect=width / height, near=1, far=10 * (L + W + H))
+    orbit = three.OrbitControls(controlling=camera, target=(L / 2, W / 2, H / 2))
+    scene = three.Scene(children=[boxes, outline, camera], background="white")
+    if not picking:
+        return three.Renderer(camera=camera, scene=scene, controls=[orbit], width=width, height=height)
+
+    # Raycasting ignores instance offsets, so clicks are caught on an invisible hull and resolved in Python
+    hull = three.Mesh(three.BoxBufferGeometry(L, W, H), three.MeshBasicMaterial(transparent=True, opacity=0.0,
+                                                                               depthWrite=False),
+                      position=(L / 2, W / 2, H / 2))
+    scene.add(hull)
+    picker = three.Picker(controlling=hull, event="dblclick")
+    renderer = three.Renderer(camera=camera, scene=scene, controls=[orbit, picker], width=width, height=height)
+
+    label = ipywidgets.Label("Double-click a box to see its ID")
+    lo, hi = offset.astype(float), offset.astype(float) + scale
+    names = d["name"] if labels is None else labels
+
+    def on_pick(change):
+        if not picker.picked:
+            return
+        i = ray_pick(camera.position, change["new"], lo, hi)
+        label.value = "No box there" if i < 0 else f"{names[i]} at ({lo[i, 0]:g}, {lo[i, 1]:g}, {lo[i, 2]:g})"
+
+    picker.observe(on_pick, names=["point"])
+    return ipywidgets.VBox([renderer, label])
+
+
+def scene_html(widget, title="Packed truck"):
+    """Standalone HTML for a viewer, e.g. for ``st.iframe``; buffers are embedded as binary.
+
+    Nothing runs Python callbacks in the exported page, so build the viewer with ``picking=False``.
+    Only ``widget`` and the widgets it uses are embedded, not every widget alive in the process.
+    """
+    from ipywidgets.embed import dependency_state, embed_minimal_html
+
+    out = io.StringIO()
+    embed_minimal_html(out, views=[widget], title=title, state=dependency_state(widget))
+    return out.getvalue()
@@ -0,0 +1,153 @@
+import numpy as np
+
+from packing import truck_names
+from results import PackResult
+
+MAX_PAIRS = 2_000_000  # candidate pairs expanded per numpy chunk, to bound memory
+
+
+def _pairs(lo, hi, max_pairs=MAX_PAIRS):
+    """Yield (i, j) index arrays for every i and every j in ``lo[i] <= j < hi[i]``, in bounded chunks."""
+    counts = np.maximum(hi - lo, 0)
+    ends = np.cumsum(counts)
+    start = 0
+    while start < len(counts):
+        stop = max(int(np.searchsorted(ends, (ends[start - 1] if start else 0) + max_pairs, side="right")), start + 1)
+        c = counts[start:stop]
+        i = np.repeat(np.arange(start, stop), c)
+        first = np.cumsum(c) - c
+        j = lo[i] + np.arange(len(i)) - np.repeat(first, c)
+        yield i, j
+        start = stop
+
+
+def _overlap(a0, a1, b0, b1):
+    return np.minimum(a1, b1) - np.maximum(a0, b0)
+
+
+def supported_area(offset, x, y, z, a, b, c, tol=1e-6):
+    """Area of each box's footprint resting on the tops of other boxes.
+
+    Boxes with different ``offset`` (a per-truck shift larger than any
+    height) never support each other. Each bottom is paired only with the
+    tops within ``tol`` of it, found by binary search over the sorted tops.
+    """
+    n = len(x)
+    top_order = np.argsort(offset + z + c, kind="stable")
+    tops = (offset + z + c)[top_order]
+    bottom = offset + z
+    lo = np.searchsorted(tops, bottom - tol, side="left")
+    hi = np.searchsorted(tops, bottom + tol, side="right")
+    supported = np.zeros(n)
+    for j, i in _pairs(lo, hi):
+        i = top_order[i]
+        area = (np.maximum(_overlap(x[i], x[i] + a[i], x[j], x[j] + a[j]), 0)
+                * np.maximum(_overlap(y[i], y[i] + b[i], y[j], y[j] + b[j]), 0))
+        supported += np.bincount(j, weights=area, minlength=n)
+    return supported
+
+
+def verify_packing(result, containers, pbins=None, max_weight=18000.0, min_support=0.5, tol=1e-6):
+    """Check a packing for overlaps, boxes outside their truck, overweight trucks and floating boxes.
+
+    ``result`` is a PackResult or the records from ``pack_items``. Overlaps are
+    found by one sort-and-sweep along the truck length over all trucks (trucks
+    are offset so their boxes never share an interval), so only boxes whose
+    length intervals meet are compared. A box above the floor is floating when
+    less than ``min_support`` of its footprint rests on box tops within
+    ``tol`` of its bottom. Weights come from ``pbins``; without it the weight
+    check is skipped.
+
+    Returns a dict of row indices into ``result.rows`` per problem
+    (``overlaps`` as (n, 2) pairs), ``overweight`` as {truck name: weight},
+    the ``result`` checked and ``ok``.
+    """
+    if not isinstance(result, PackResult):
+        result = PackResult.from_records(result, truck_names(containers))
+    rows = result.rows
+    n = len(rows)
+    x, y, z = (rows[col].astype(float) for col in ("xx", "yy", "zz"))
+    a, b, c = (rows[col].astype(float) for col in ("h", "w", "l"))
+    dims = np.asarray(containers, dtype=float).reshape(-1, 3)
+    fleet = {name: i for i, name in enumerate(truck_names(containers))}
+    truck_dims = dims[[fleet[name] for name in result.truck_names]] if len(result.truck_names) else dims[:0]
+    truck = rows["truck"].astype(np.int64)
+
+    outside = ((x < -tol) | (y < -tol) | (z < -tol) | (a <= 0) | (b <= 0) | (c <= 0)
+               | (x + a > truck_dims[truck, 0] + tol) | (y + b > truck_dims[truck, 1] + tol)
+               | (z + c > truck_dims[truck, 2] + tol))
+
+    # Trucks are laid end to end this far apart along each sort key, so they never mix
+    stride = float(np.abs(np.concatenate([x + a, y + b, z + c, dims.ravel(), [0.0]])).max()) * 2 + 1
+
+    # Broad phase: sorted by (truck, x), box i can only meet the boxes starting before it ends
+    order = np.argsort(truck * stride + x, kind="stable")
+    start = (truck * stride + x)[order]
+    end = start + a[order]
+    hi = np.searchsorted(start, end - tol, side="left")
+    overlaps = []
+    for i, j in _pairs(np.arange(1, n + 1), hi):
+        i, j = order[i], order[j]
+        hit = ((_overlap(x[i], x[i] + a[i], x[j], x[j] + a[j]) > tol)
+               & (_overlap(y[i], y[i] + b[i], y[j], y[j] + b[j]) > tol)
+               & (_overlap(z[i], z[i] + c[i], z[j], z[j] + c[j]) > tol))
+        overlaps.append(np.stack([i[hit], j[hit]], axis=1))
+    overlaps = np.concatenate(overlaps) if overlaps else np.zeros((0, 2), dtype=np.int64)
+
+    supported = supported_area(truck * stride, x, y, z, a, b, c, tol)
+    footprint = a * b
+    floating = (z > tol) & (supported < min_support * footprint - tol)
+
+    overweight = {}
+    if pbins is not None:
+        type_weight = {str(name): float(cfg["s"][3]) for name, cfg in pbins.items()}
+        weights = np.array([type_weight.get(str(name), 0.0) for name in result.type_names])[rows["type"]]
+        load = np.bincount(truck, weights=weights, minlength=len(result.truck_names))
+        overweight = {result.truck_names[t]: float(load[t]) for t in np.flatnonzero(load > max_weight + tol)}
+
+    report = {
+        "boxes": n,
+        "overlaps": overlaps,
+        "out_of_bounds": np.flatnonzero(outside),
+        "overweight": overweight,
+        "floating": np.flatnonzero(floating),
+        "support": np.divide(supported, footprint, out=np.ones(n), where=(z > tol) & (footprint > 0)),
+        "result": result,
+    }
+    report["ok"] = not (len(overlaps) or report["out_of_bounds"].size or overweight or report["floating"].size)
+    return report
+
+
+def violation_counts(report):
+    """Number of problems of each kind, for summaries and benchmark results."""
+    return {
+        "overlaps": int(len(report["overlaps"])),
+        "out_of_bounds": int(report["out_of_bounds"].size),
+        "overweight_trucks": len(report["overweight"]),
+        "floating": int(report["floating"].size),
+    }
+
+
+def describe(report, limit=5):
+    """One line per kind of problem found, naming up to ``limit`` boxes each."""
+    result = report["result"]
+
+    def labels(idx):
+        idx = np.asarray(idx, dtype=np.int64)[:limit]
+        return [f"{t} {item}" for t, item in zip(result.truck_names[result.rows["truck"][idx]],
+                                                  result.item_names(result.rows[idx]))]
+
+    lines = []
+    if len(report["overlaps"]):
+        pairs = report["overlaps"][:limit]
+        lines.append(f"{len(report['overlaps'])} overlapping pairs: "
+                     + "; ".join(f"{i} / {j}" for i, j in zip(labels(pairs[:, 0]), labels(pairs[:, 1]))))
+    if report["out_of_bounds"].size:
+        lines.append(f"{report['out_of_bounds'].size} boxes outside their truck: "
+                     + ", ".join(labels(report["out_of_bounds"])))
+    if report["overweight"]:
+        lines.append("Overweight trucks: " + ", ".join(f"{t} ({w:g})" for t, w in report["overweight"].items()))
+    if report["floating"].size:
+        lines.append(f"{report['floating'].size} boxes without enough support: "
+                     + ", ".join(labels(report["floating"])))
+    return lines
@@ -0,0 +1,102 @@
+"""Cross-check verify.verify_packing against an all-pairs brute force on plans with injected faults.
+
+    python verify_check.py --boxes 2000 --faults 20 --seeds 0 1 2
+
+Each seed packs a synthetic manifest (see benchmark.py), then moves some boxes
+onto others, lifts some off their support and pushes some out of their truck.
+The overlap pairs, floating boxes and boxes out of bounds found by the
+sort-and-sweep verifier must be exactly those found by comparing every pair
+of boxes in each truck. Exits with status 1 on any difference.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from benchmark import make_boxes, make_trucks
+from pack_cache import PackCache
+from packing import ENGINES, build_containers, build_pbins, pack_items, truck_names
+from results import PackResult
+from verify import verify_packing
+
+
+def inject_faults(result, containers, n_faults, seed=0):
+    """Copy of ``result`` with ``n_faults`` boxes each of overlapping, lifted and out of their truck."""
+    rng = np.random.default_rng(seed)
+    rows = result.rows.copy()
+    dims = np.asarray(containers, dtype=float)[[truck_names(containers).index(name) for name in result.truck_names]]
+    picked = rng.choice(len(rows), size=min(3 * n_faults, len(rows)), replace=False)
+    moved, lifted, pushed = np.array_split(picked, 3)
+    for i in moved:
+        # Onto another box of the same truck, shifted by less than either box's size
+        same = np.flatnonzero((rows["truck"] == rows["truck"][i]) & (np.arange(len(rows)) != i))
+        if len(same):
+            j = rng.choice(same)
+            for col, size in (("xx", "h"), ("yy", "w"), ("zz", "l")):
+                rows[col][i] = rows[col][j] + rng.uniform(0, 0.5) * min(rows[size][i], rows[size][j])
+    rows["zz"][lifted] += rng.uniform(1, 10, size=len(lifted))
+    rows["xx"][pushed] = dims[rows["truck"][pushed], 0] - rows["h"][pushed] / 2
+    return PackResult(rows, result.truck_names, result.type_names)
+
+
+def brute_force(result, containers, min_support=0.5, tol=1e-6):
+    """(overlap pairs, floating boxes, boxes out of bounds) from comparing every pair of boxes in each truck."""
+    rows = result.rows
+    dims = np.asarray(containers, dtype=float)[[truck_names(containers).index(name) for name in result.truck_names]]
+    pairs, floating, outside = set(), set(), set()
+    for t in range(len(result.truck_names)):
+        idx = np.flatnonzero(rows["truck"] == t)
+        x, y, z, a, b, c = (rows[col][idx].astype(float) for col in ("xx", "yy", "zz", "h", "w", "l"))
+        ox = np.minimum.outer(x + a, x + a) - np.maximum.outer(x, x)
+        oy = np.minimum.outer(y + b, y + b) - np.maximum.outer(y, y)
+        oz = np.minimum.outer(z + c, z + c) - np.maximum.outer(z, z)
+        i, j = np.nonzero(np.triu((ox > tol) & (oy > tol) & (oz > tol), k=1))
+        pairs.update(zip(idx[i].tolist(), idx[j].tolist()))
+        # Box i rests on box j where j's top is at i's bottom; count the shared footprint
+        resting = np.abs(z[:, None] - (z + c)[None, :]) <= tol
+        supported = (resting * np.clip(ox, 0, None) * np.clip(oy, 0, None)).sum(axis=1)
+        floating.update(idx[(z > tol) & (supported < min_support * a * b - tol)].tolist())
+        outside.update(idx[(x < -tol) | (y < -tol) | (z < -tol) | (x + a > dims[t, 0] + tol)
+                           | (y + b > dims[t, 1] + tol) | (z + c > dims[t, 2] + tol)].tolist())
+    return pairs, floating, outside
+
+
+def check(n_boxes, n_types, n_trucks, n_faults, engine="blocks", seed=0):
+    """One line comparing the verifier with the brute force, and whether they agree."""
+    pbins = build_pbins(make_boxes(n_boxes, n_types, seed))
+    containers = build_containers(make_trucks(n_trucks, seed))
+    # A fresh pattern library, so the plan doesn't depend on what earlier runs stored on disk
+    records = pack_items(containers, pbins, engine=engine, patterns=PackCache(max_entries=4096))
+    result = PackResult.from_records(records, truck_names(containers))
+    result = inject_faults(result, containers, n_faults, seed)
+
+    report = verify_packing(result, containers)
+    found = ({tuple(sorted(pair)) for pair in report["overlaps"].tolist()},
+             set(report["floating"].tolist()), set(report["out_of_bounds"].tolist()))
+    expected = brute_force(result, containers)
+    ok = found == expected
+    counts = ", ".join(f"{kind} {len(f)}/{len(e)}"
+                       for kind, f, e in zip(("overlaps", "floating", "out of bounds"), found, expected))
+    return f"seed {seed}, {len(result)} boxes: {counts} (verifier/brute force) {'ok' if ok else 'MISMATCH'}", ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boxes", type=int, default=2000)
+    parser.add_argument("--types", type=int, default=12)
+    parser.add_argument("--trucks", type=int, default=6)
+    parser.add_argument("--faults", type=int, default=20, help="boxes per kind of fault")
+    parser.add_argument("--engine", choices=[e for e in ENGINES if e != "py3dbp"], default="blocks")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    args = parser.parse_args(argv)
+
+    all_ok = True
+    for seed in args.seeds:
+        line, ok = check(args.boxes, args.types, args.trucks, args.faults, args.engine, seed)
+        print(line)
+        all_ok &= ok
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())